@@ -0,0 +1,43 @@
+'''
+比较uvvis.draw_uvvis逐条plot、LineCollection以及LineCollection加抽稀三种模式的绘制耗时
+耗时包括建图和一次Agg渲染(fig.canvas.draw)
+用法：python benchmark/bench_draw_uvvis.py [波长步长nm]
+'''
+import os, sys, time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import uvvis
+from synthetic import absorption_spectrum
+
+MODES = (
+    ('plot', {}),
+    ('LineCollection', {'line_collection': True}),
+    ('LineCollection+抽稀', {'line_collection': True, 'decimate': True}),
+)
+
+def make_collection(n_spectra, step):
+    wavelength_array = np.arange(800, 200-step/2, -step, dtype=float)
+    absorbance_matrix = np.array([
+        absorption_spectrum(wavelength_array, height=np.exp(-0.001*i), seed=i)
+        for i in range(n_spectra)])
+    return uvvis.SpectrumCollection(wavelength_array, absorbance_matrix, [str(i) for i in range(n_spectra)])
+
+def main(step=0.2):
+    print('%8s %22s %10s' % ('光谱数', '模式', '耗时(s)'))
+    for n_spectra in (10, 100, 500, 2000):
+        collection = make_collection(n_spectra, step)
+        for label, kwargs in MODES:
+            t0 = time.perf_counter()
+            fig = uvvis.draw_uvvis(collection, colormap='viridis', **kwargs)
+            fig.canvas.draw()
+            elapsed = time.perf_counter()-t0
+            plt.close(fig)
+            print('%8d %22s %10.3f' % (n_spectra, label, elapsed))
+
+if __name__ == '__main__':
+    main(*[float(a) for a in sys.argv[1:2]])
@@ -0,0 +1,47 @@
+'''
+用python -X importtime测量uvvis、uvvisdrs、calculation等模块的导入耗时，
+并检查只导入这些模块时没有加载绘图、拟合和导出用的重型依赖
+有重型依赖被加载时退出码为1，可用于防止导入耗时的回退
+用法：python benchmark/bench_import_time.py [模块名...]
+'''
+import os, sys, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['uvvis', 'uvvisdrs', 'calculation', 'mmapread', 'datacache', 'npzio']
+# 只在绘图、拟合和导出时才需要的模块
+HEAVY = [
+    'matplotlib', 'matplotlib.pyplot', 'scipy', 'scipy.optimize', 'scipy.interpolate',
+    'scipy.stats', 'xlsxwriter', 'openpyxl',
+]
+
+def import_times(module):
+    '''
+    在新的解释器中导入module，返回{模块名: 累计导入耗时(us)}
+    '''
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+        cwd=ROOT, check=True, capture_output=True, text=True).stderr
+    times = {}
+    for line in out.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+def main(modules=MODULES):
+    failed = False
+    print('%-14s %12s  %s' % ('模块', '导入耗时(ms)', '已加载的重型依赖'))
+    for module in modules:
+        times = import_times(module)
+        heavy = [m for m in HEAVY if m in times]
+        print('%-14s %12.1f  %s' % (module, times.get(module, 0)/1e3, ', '.join(heavy) or '-'))
+        failed = failed or bool(heavy)
+    if failed:
+        print('\n有模块在导入时加载了重型依赖，请改为在用到的函数中导入')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:] or MODULES))
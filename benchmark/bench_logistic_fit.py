@@ -0,0 +1,50 @@
+'''
+比较calculation.logistic_fit各方法在示例DRS文件上的耗时和精度
+精度以默认的curve_fit方法为基准：拟合曲线的最大相对偏差，以及最终带隙的偏差
+用法：python benchmark/bench_logistic_fit.py [重复次数]
+'''
+import os, sys, time, warnings
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import calculation
+from uvvisdrs import UvvisDrsData
+
+EXAMPLES = [os.path.join(ROOT, 'example', 'uvvisdrs', f) for f in ('1.txt', '3.txt')]
+
+def load_example(file):
+    wavelength, transmittance = np.loadtxt(file, delimiter=',', skiprows=2, encoding='latin-1').T
+    return UvvisDrsData(wavelength, transmittance/100, os.path.basename(file))
+
+def timed(func, repeat):
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        result = func()
+    return (time.perf_counter()-t0)/repeat, result
+
+def main(repeat=50):
+    warnings.simplefilter('ignore', RuntimeWarning)
+    samples = [load_example(f) for f in EXAMPLES]
+    print('%-8s %-12s %-10s %10s %12s %12s' % ('样品', '曲线', '方法', '耗时(ms)', '曲线偏差', 'Eg偏差(eV)'))
+    for drs in samples:
+        for label, y in (('(hvF(R))^2', drs.hvfr2), ('(hvF(R))^1/2', drs.hvfr12)):
+            ref = calculation.logistic_fit(drs.hv, y)
+            ref_eg = drs.calculate_eg(y, ref)[0]
+            for method in ('curve_fit', 'jacobian', 'linear'):
+                elapsed, fit = timed(lambda: calculation.logistic_fit(drs.hv, y, method), repeat)
+                eg = drs.calculate_eg(y, fit)[0]
+                print('%-8s %-12s %-10s %10.3f %12.2e %12.2e' % (
+                    drs.name, label, method, elapsed*1e3, np.nanmax(abs(fit-ref))/y.max(), abs(eg-ref_eg)))
+
+    # 热启动：以另一个样品的参数作为初始值
+    print()
+    for method in ('curve_fit', 'jacobian'):
+        for drs, other in (samples, samples[::-1]):
+            p0 = UvvisDrsData(other.wavelength_array, other.reflectance_array, other.name, method).logi_params
+            cold, _ = timed(lambda: calculation.logistic_fit(drs.hv, drs.hvfr2, method), repeat)
+            warm, _ = timed(lambda: calculation.logistic_fit(drs.hv, drs.hvfr2, method, p0[0]), repeat)
+            print('%-10s %s 冷启动 %.3fms  以%s的参数热启动 %.3fms' % (method, drs.name, cold*1e3, other.name, warm*1e3))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
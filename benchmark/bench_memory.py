@@ -0,0 +1,97 @@
+'''
+比较大量光谱常驻内存时每条光谱占用的内存
+每种存储方式在单独的子进程中构造，用tracemalloc统计构造前后新分配的内存（包括numpy数组的数据区）
+uvvis的各种方式：
+  dict            带__dict__的普通类，每条光谱有自己的float64波长数组（改用__slots__之前的UvvisData）
+  slots           UvvisData，每条光谱有自己的波长数组
+  slots_shared    UvvisData，共用同一个波长数组（read_ascfiles读取的结果）
+  float32         同上，吸光度以float32存储
+  collection      SpectrumCollection
+uvvisdrs的各种方式（完成拟合后）：
+  drs_cached      另外保存hv、F(R)、(hvF(R))^2、(hvF(R))^1/2四个数组（改为每次重新计算之前的UvvisDrsData）
+  drs             UvvisDrsData
+  drs_float32     UvvisDrsData，反射率以float32存储
+用法：python benchmark/bench_memory.py [光谱数] [波长步长nm] [DRS样品数]
+'''
+import os, sys, subprocess, tracemalloc
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+UVVIS_MODES = ('dict', 'slots', 'slots_shared', 'float32', 'collection')
+DRS_MODES = ('drs_cached', 'drs', 'drs_float32')
+
+class DictUvvisData:
+    '改用__slots__之前的UvvisData的存储方式'
+    def __init__(self, wavelength_array, absorbance_array, name):
+        self.wavelength_array = wavelength_array
+        self.absorbance_array = absorbance_array
+        self.name = name
+        self._spline = None
+
+def build_uvvis(mode, n, step):
+    import uvvis
+    from synthetic import absorption_spectrum
+    grid = np.arange(800, 200-step/2, -step, dtype=float)
+    if mode == 'collection':
+        names = [str(i) for i in range(n)]
+        matrix = np.empty((n, len(grid)))
+        for i in range(n):
+            matrix[i] = absorption_spectrum(grid, height=np.exp(-1e-4*i), seed=i)
+        return uvvis.SpectrumCollection(grid, matrix, names)
+    datas = []
+    for i in range(n):
+        absorbance = absorption_spectrum(grid, height=np.exp(-1e-4*i), seed=i)
+        if mode == 'dict':
+            datas.append(DictUvvisData(grid.copy(), absorbance, str(i)))
+        elif mode == 'slots':
+            datas.append(uvvis.UvvisData(grid.copy(), absorbance, str(i)))
+        else:
+            dtype = np.float32 if mode == 'float32' else None
+            datas.append(uvvis.UvvisData(grid, absorbance, str(i), dtype))
+    return datas
+
+def build_drs(mode, n):
+    import uvvisdrs
+    from synthetic import reflectance_spectrum
+    wavelength = np.arange(200, 800.25, 0.5, dtype=float)
+    datas = []
+    for i in range(n):
+        reflectance = reflectance_spectrum(wavelength, seed=i)/100
+        dtype = np.float32 if mode == 'drs_float32' else None
+        drs = uvvisdrs.UvvisDrsData(wavelength.copy(), reflectance, 'sample%d' % i, fit_method='linear', dtype=dtype)
+        drs.egd, drs.egi
+        if mode == 'drs_cached':
+            datas.append((drs, drs.hv, drs.fr, drs.hvfr2, drs.hvfr12))
+        else:
+            datas.append(drs)
+    return datas
+
+def child(mode, n, step):
+    # 先导入并预热，模块和缓存的内存不计入
+    build_drs('drs', 1) if mode in DRS_MODES else build_uvvis(mode, 1, step)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    datas = build_drs(mode, n) if mode in DRS_MODES else build_uvvis(mode, n, step)
+    after = tracemalloc.get_traced_memory()[0]
+    print((after-before)/n, len(datas))
+
+def main(n_spectra=100000, step=1.0, n_drs=1000):
+    print('%d条光谱，每条%d个数据点' % (n_spectra, round(600/step)+1))
+    runs = [(mode, n_spectra, step) for mode in UVVIS_MODES]
+    runs += [(mode, n_drs, 1.0) for mode in DRS_MODES]
+    for mode, n, step in runs:
+        if mode == DRS_MODES[0]:
+            print('\n%d个DRS样品，每个1201个数据点' % n_drs)
+        out = subprocess.run(
+            [sys.executable, __file__, 'child', mode, str(n), str(step)],
+            check=True, capture_output=True, text=True).stdout
+        per_item = float(out.split()[0])
+        print('%-14s 每条 %9.1fKB  共 %8.1fMB' % (mode, per_item/1024, per_item*n/2**20))
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['child']:
+        child(sys.argv[2], int(sys.argv[3]), float(sys.argv[4]))
+    else:
+        main(*[f(a) for f, a in zip((int, float, int), sys.argv[1:])])
@@ -0,0 +1,32 @@
+'''
+比较uvvis.read_asc整块解析与逐行解析的耗时
+用法：python benchmark/bench_read_asc.py [文件数] [波长步长nm]
+'''
+import os, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import uvvis
+from synthetic import write_asc
+
+def bench(paths, fast):
+    t0 = time.perf_counter()
+    datas = [uvvis.read_asc(p, fast=fast) for p in paths]
+    return time.perf_counter()-t0, datas
+
+def main(n_files=200, step=0.1):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [write_asc(os.path.join(tmp, '%d.asc' % i), step=step, seed=i) for i in range(n_files)]
+        size = sum(os.path.getsize(p) for p in paths)
+        print('%d个文件，每个%d个数据点，共%.1fMB' % (
+            n_files, round(600/step)+1, size/2**20))
+        t_lines, lines = bench(paths, fast=False)
+        t_block, block = bench(paths, fast=True)
+        for a, b in zip(lines, block):
+            assert np.array_equal(a.wavelength_array, b.wavelength_array)
+            assert np.array_equal(a.absorbance_array, b.absorbance_array)
+        print('逐行解析: %.3fs' % t_lines)
+        print('整块解析: %.3fs  (%.1fx)' % (t_block, t_lines/t_block))
+
+if __name__ == '__main__':
+    main(*[f(a) for f, a in zip((int, float), sys.argv[1:])])
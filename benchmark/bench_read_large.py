@@ -0,0 +1,95 @@
+'''
+比较很大的DRS和asc文件逐行解析与内存映射分块解析(mmapread)的耗时和峰值内存
+测试文件在单独的子进程中生成，每次解析也在单独的子进程中运行，
+峰值内存为解析前后子进程峰值常驻内存(/proc/self/status中的VmHWM，解析前先重置)的增量，
+没有/proc时改用ru_maxrss，它会继承父进程的峰值，所以父进程不生成测试文件。
+mmap方式的增量中包含已映射的文件页，这部分属于页缓存，内存紧张时可被系统回收
+用法：python benchmark/bench_read_large.py [扫描次数]
+'''
+import os, sys, subprocess, tempfile, time, resource
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def parse_raw_lines(file):
+    '逐行解析DRS文件，即改用mmapread之前uvvisdrs._parse_raw的做法'
+    with open(file, 'r', encoding='gbk') as txt:
+        txtline = '1'
+        while txtline != '':
+            txtline = txt.readline()
+            if txtline == '"波长(nm)","T%"\n':
+                break
+        wavelength, reflectance_array = [], []
+        txtline = txt.readline()
+        while txtline != '':
+            txtline = txtline.strip('\n')
+            wavelength.append(float(txtline.split(',')[0]))
+            reflectance_array.append(float(txtline.split(',')[1]))
+            txtline = txt.readline()
+    return np.array(wavelength), np.array(reflectance_array)/100
+
+def reset_peak():
+    '把VmHWM重置为当前的常驻内存，不支持时什么也不做'
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_rss():
+    '本进程的峰值常驻内存(MB)'
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])/1024
+    except OSError:
+        pass
+    # ru_maxrss在Linux下单位为KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+
+def make_files(tmp, scans):
+    from synthetic import write_drs, write_asc
+    drs_file = write_drs(os.path.join(tmp, 'large.txt'), scans=scans, seed=0)
+    asc_file = write_asc(os.path.join(tmp, 'large.asc'), step=600/(1201*scans), seed=0)
+    print(drs_file)
+    print(asc_file)
+
+def child(kind, method, file):
+    import uvvis, uvvisdrs
+    parsers = {
+        ('drs', 'lines'): parse_raw_lines,
+        ('drs', 'mmap'): uvvisdrs._parse_raw,
+        ('asc', 'lines'): uvvis._parse_asc_lines,
+        ('asc', 'mmap'): uvvis._parse_asc_block,
+    }
+    reset_peak()
+    rss_before = peak_rss()
+    t0 = time.perf_counter()
+    arrays = parsers[kind, method](file)
+    elapsed = time.perf_counter()-t0
+    rss_after = peak_rss()
+    print(elapsed, rss_after-rss_before, sum(a.nbytes for a in arrays)/2**20)
+
+def main(scans=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        drs_file, asc_file = subprocess.run(
+            [sys.executable, __file__, 'make', tmp, str(scans)],
+            check=True, capture_output=True, text=True).stdout.split()
+        for kind, file in (('drs', drs_file), ('asc', asc_file)):
+            print('%s文件 %.1fMB' % (kind, os.path.getsize(file)/2**20))
+            for method in ('lines', 'mmap'):
+                out = subprocess.run(
+                    [sys.executable, __file__, 'child', kind, method, file],
+                    check=True, capture_output=True, text=True).stdout
+                elapsed, peak, data = map(float, out.split())
+                print('  %-6s 耗时 %6.2fs  峰值内存增量 %7.1fMB  结果数组 %6.1fMB' % (method, elapsed, peak, data))
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['child']:
+        child(*sys.argv[2:5])
+    elif sys.argv[1:2] == ['make']:
+        make_files(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,74 @@
+'''
+比较改为逐行写出之前的导出方式（基准）与uvvis.write_uvvis_datas默认模式、constant_memory模式的耗时和峰值内存
+每种方式在单独的子进程中运行，峰值内存为子进程的最大常驻内存(RSS)
+用法：python benchmark/bench_write_xlsx.py [光谱数] [波长步长nm]
+'''
+import os, sys, subprocess, tempfile, time, resource
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def make_collection(n_spectra, step):
+    import uvvis
+    from synthetic import absorption_spectrum
+    wavelength_array = np.arange(800, 200-step/2, -step, dtype=float)
+    absorbance_matrix = np.array([
+        absorption_spectrum(wavelength_array, height=np.exp(-0.01*i), seed=i)
+        for i in range(n_spectra)])
+    return uvvis.SpectrumCollection(wavelength_array, absorbance_matrix, [str(i) for i in range(n_spectra)])
+
+def write_uvvis_datas_columns(file_path, collection):
+    '逐列写入每条光谱，即改为逐行写出之前uvvis.write_uvvis_datas（波长网格一致时）的做法'
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(file_path)
+    center = wb.add_format({'align': 'center'})
+    ws1 = wb.add_worksheet('combined')
+    n = 0
+    ws1.write(0,n, 'name→')
+    ws1.write(1,n, 'nm')
+    ws1.write_column(2,n, collection.wavelength_array)
+    n+=1
+    for name, absorbance_array in zip(collection.names, collection.absorbance_matrix):
+        ws1.write_column(0,n, [name, 'A'])
+        ws1.write_column(2,n, absorbance_array)
+        n+=1
+    ws1.set_column(0,n, 10, center)
+    wb.close()
+
+def write_default(file_path, collection):
+    import uvvis
+    uvvis.write_uvvis_datas(file_path, collection)
+
+def write_constant_memory(file_path, collection):
+    import uvvis
+    uvvis.write_uvvis_datas(file_path, collection, constant_memory=True)
+
+MODES = {'baseline': write_uvvis_datas_columns, 'default': write_default, 'constant_memory': write_constant_memory}
+LABELS = {'baseline': '基准（逐列写入）', 'default': '默认模式', 'constant_memory': 'constant_memory'}
+
+def child(n_spectra, step, mode):
+    collection = make_collection(n_spectra, step)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        MODES[mode](os.path.join(tmp, 'bench.xlsx'), collection)
+        elapsed = time.perf_counter()-t0
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss在Linux下单位为KB
+    print(elapsed, rss_before/1024, rss_after/1024)
+
+def main(n_spectra=1000, step=1.0):
+    print('%d条光谱，每条%d个数据点' % (n_spectra, round(600/step)+1))
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, __file__, 'child', str(n_spectra), str(step), mode],
+            check=True, capture_output=True, text=True).stdout
+        elapsed, rss_before, rss_after = map(float, out.split())
+        print('%-22s 耗时 %7.2fs  峰值RSS %7.1fMB (写出前 %.1fMB)' % (LABELS[mode], elapsed, rss_after, rss_before))
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['child']:
+        child(int(sys.argv[2]), float(sys.argv[3]), sys.argv[4])
+    else:
+        main(*[f(a) for f, a in zip((int, float), sys.argv[1:])])
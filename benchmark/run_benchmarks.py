@@ -0,0 +1,262 @@
+'''
+基准测试套件：在合成数据上测量主要处理步骤的耗时，结果按git提交保存，用于比较不同提交之间的性能
+用法：
+python benchmark/run_benchmarks.py                      # 默认规模，结果保存到benchmark/results/<提交>.json
+python benchmark/run_benchmarks.py --scale full         # 包括10万个文件的规模
+python benchmark/run_benchmarks.py -k read --repeat 10  # 只运行名字含read的项目
+python benchmark/run_benchmarks.py --compare abc1234    # 与提交abc1234的结果比较，变慢超过阈值时退出码为1
+'''
+import os, sys, json, time, platform, argparse, subprocess, tempfile, warnings
+from statistics import median
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import uvvis, uvvisdrs, calculation
+from synthetic import write_asc, make_asc_dir, make_drs_dir
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# 各规模下数据集的最大文件数（光谱数）
+SCALES = {'quick': 10, 'default': 1000, 'full': 100000}
+SIZES = (10, 1000, 100000)
+
+class Datasets:
+    '''
+    按需生成并缓存合成数据集，同一次运行中的各项目共用
+    '''
+    def __init__(self, tmp):
+        self.tmp = tmp
+        self._cache = {}
+
+    def _get(self, key, make):
+        if key not in self._cache:
+            self._cache[key] = make()
+        return self._cache[key]
+
+    def asc_file(self, step):
+        return self._get(('asc_file', step), lambda: write_asc(
+            os.path.join(self.tmp, 'single_%g.asc' % step), step=step, seed=0))
+
+    def asc_dir(self, n):
+        def make():
+            filedir = os.path.join(self.tmp, 'asc_%d' % n)
+            make_asc_dir(filedir, n)
+            return filedir
+        return self._get(('asc_dir', n), make)
+
+    def uvvis_datas(self, n):
+        return self._get(('uvvis_datas', n), lambda: uvvis.read_ascdir(self.asc_dir(n)))
+
+    def drs_files(self, n):
+        return self._get(('drs_files', n), lambda: make_drs_dir(os.path.join(self.tmp, 'drs_%d' % n), n))
+
+    def drs_arrays(self):
+        return self._get('drs_arrays', lambda: uvvisdrs._parse_raw(self.drs_files(10)[0]))
+
+    def drs_data(self):
+        def make():
+            drs = uvvisdrs.UvvisDrsData(*self.drs_arrays(), 'bench')
+            drs.egd, drs.egi
+            return drs
+        return self._get('drs_data', make)
+
+# 每个项目为(名字, 规模列表或None, setup)，setup(datasets, 规模)完成准备工作并返回要计时的无参函数
+CASES = []
+
+def case(name, sizes=None):
+    def register(setup):
+        CASES.append((name, sizes, setup))
+        return setup
+    return register
+
+@case('read_asc', sizes=(1, 0.1))
+def bench_read_asc(data, step):
+    # 规模为波长步长(nm)
+    path = data.asc_file(step)
+    return lambda: uvvis.read_asc(path)
+
+@case('read_ascdir', sizes=SIZES)
+def bench_read_ascdir(data, n):
+    filedir = data.asc_dir(n)
+    return lambda: uvvis.read_ascdir(filedir)
+
+@case('read_ascdir_threads', sizes=SIZES)
+def bench_read_ascdir_threads(data, n):
+    filedir = data.asc_dir(n)
+    return lambda: uvvis.read_ascdir(filedir, workers=8)
+
+@case('get_concentration_change', sizes=SIZES)
+def bench_get_concentration_change(data, n):
+    datas = data.uvvis_datas(n)
+    return lambda: uvvis.get_concentration_change(datas, 485)
+
+@case('write_uvvis_datas', sizes=SIZES[:2])
+def bench_write_uvvis_datas(data, n):
+    datas = data.uvvis_datas(n)
+    path = os.path.join(data.tmp, 'bench_%d.xlsx' % n)
+    return lambda: uvvis.write_uvvis_datas(path, datas, constant_memory=True)
+
+@case('UvvisDrsData', sizes=('curve_fit', 'jacobian'))
+def bench_drs_construction(data, method):
+    # 构造并完成拟合，规模为logistic拟合的方法
+    wavelength, reflectance = data.drs_arrays()
+    def run():
+        drs = uvvisdrs.UvvisDrsData(wavelength, reflectance, 'bench', fit_method=method)
+        return drs.egd, drs.egi
+    return run
+
+@case('fit_batch', sizes=SIZES)
+def bench_fit_batch(data, n):
+    files = data.drs_files(n)
+    return lambda: uvvisdrs.fit_batch(files, fit_method='jacobian')
+
+@case('calculate_eg')
+def bench_calculate_eg(data, size):
+    drs = data.drs_data()
+    return lambda: drs.calculate_eg(drs.hvfr2, drs.hvfr2_logi_fit)
+
+@case('cmap_interpolation', sizes=SIZES)
+def bench_cmap_interpolation(data, n):
+    return lambda: calculation.cmap_interpolation('viridis', n)
+
+def _draw(draw):
+    fig = draw()
+    fig.canvas.draw()
+    plt.close(fig)
+
+@case('draw_uvvis', sizes=SIZES[:2])
+def bench_draw_uvvis(data, n):
+    datas = data.uvvis_datas(n)
+    return lambda: _draw(lambda: uvvis.draw_uvvis(datas, colormap='viridis', legend_loc='upper right'))
+
+@case('draw_uvvis_line_collection', sizes=SIZES[:2])
+def bench_draw_uvvis_line_collection(data, n):
+    datas = data.uvvis_datas(n)
+    return lambda: _draw(lambda: uvvis.draw_uvvis(datas, line_collection=True, decimate=True))
+
+@case('draw_concentration_change', sizes=SIZES[:2])
+def bench_draw_concentration_change(data, n):
+    cc_datas = [uvvis.get_concentration_change(data.uvvis_datas(n), 485, 'bench')]
+    return lambda: _draw(lambda: uvvis.draw_concentration_change(cc_datas))
+
+@case('draw_hvfr')
+def bench_draw_hvfr(data, size):
+    drs = data.drs_data()
+    return lambda: _draw(drs.draw_hvfr)
+
+def timeit(func, repeat, budget):
+    '''
+    运行func最多repeat次，累计超过budget秒后不再重复，返回各次耗时
+    '''
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter()-t0)
+        if sum(times) > budget:
+            break
+    return times
+
+def git_commit():
+    '''
+    当前提交的短哈希，工作区有未提交的修改时加上-dirty
+    '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                check=True, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit+'-dirty' if dirty else commit
+
+def run(scale='default', pattern=None, repeat=5, budget=10.0):
+    '''
+    运行基准测试，返回{项目名: {'min', 'median', 'runs'}}
+    '''
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        data = Datasets(tmp)
+        for name, sizes, setup in CASES:
+            for size in sizes or [None]:
+                key = name if size is None else '%s[%s]' % (name, size)
+                if pattern and pattern not in key:
+                    continue
+                if isinstance(size, int) and size > SCALES[scale]:
+                    continue
+                func = setup(data, size)
+                times = timeit(func, repeat, budget)
+                results[key] = {'min': min(times), 'median': median(times), 'runs': len(times)}
+                print('%-40s %10.4fs %10.4fs  x%d' % (key, results[key]['min'], results[key]['median'], len(times)))
+    return results
+
+def compare(results, base, threshold):
+    '''
+    与base的结果比较中位数，返回变慢超过threshold（比例）的项目列表
+    '''
+    print('\n%-40s %10s %10s %8s' % ('项目', '本次', '基准', '比值'))
+    slower = []
+    for key, result in results.items():
+        if key not in base:
+            continue
+        ratio = result['median']/base[key]['median']
+        flag = ''
+        if ratio > 1+threshold:
+            flag = '  变慢'
+            slower.append(key)
+        elif ratio < 1/(1+threshold):
+            flag = '  变快'
+        print('%-40s %10.4f %10.4f %8.2f%s' % (key, result['median'], base[key]['median'], ratio, flag))
+    return slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='运行基准测试并按git提交保存结果')
+    parser.add_argument('--scale', choices=list(SCALES), default='default', help='数据集规模')
+    parser.add_argument('-k', dest='pattern', default=None, help='只运行名字包含该字符串的项目')
+    parser.add_argument('--repeat', type=int, default=5, help='每个项目最多重复的次数')
+    parser.add_argument('--budget', type=float, default=10.0, help='每个项目累计耗时超过该秒数后不再重复')
+    parser.add_argument('--compare', default=None, help='与该提交（results中的文件名）的结果比较')
+    parser.add_argument('--threshold', type=float, default=0.2, help='比较时判定为变慢的比例')
+    parser.add_argument('--no-save', action='store_true', help='不保存本次结果')
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    print('提交 %s，规模 %s' % (commit, args.scale))
+    results = run(args.scale, args.pattern, args.repeat, args.budget)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, '%s.json' % commit)
+        # 同一提交多次运行时合并，只运行了部分项目也不会覆盖其他项目
+        record = {'results': {}}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+        record['results'].update(results)
+        record.update({
+            'commit': commit,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'scale': args.scale,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+        })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        print('结果已保存至', path)
+
+    if args.compare:
+        with open(os.path.join(RESULTS_DIR, '%s.json' % args.compare), encoding='utf-8') as f:
+            base = json.load(f)['results']
+        if compare(results, base, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
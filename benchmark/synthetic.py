@@ -0,0 +1,87 @@
+'''
+生成用于基准测试的合成数据
+'''
+import os
+import numpy as np
+
+ASC_HEADER = '''PE UV       SUBTECH     SPECTRUM    ASCII       PEDS        4.00        -1
+{name}.asc
+18/03/29
+10:25:42.00
+18/03/29
+10:25:42.00
+Lambda 35
+1.27
+PerkinElmer UV WinLab 6.0.4.0738
+nm
+A
+{n}
+#DATA
+'''
+
+def absorption_spectrum(wavelength_array, peak=485, width=40, height=1.0, seed=None):
+    '''
+    高斯吸收峰加噪声的模拟吸光度数组
+    '''
+    rng = np.random.default_rng(seed)
+    absorbance = height*np.exp(-((wavelength_array-peak)/width)**2)
+    return absorbance + rng.normal(0, 0.002, len(wavelength_array))
+
+def write_asc(asc_file, start=800, end=200, step=1, height=1.0, seed=None):
+    '''
+    写入一个PerkinElmer Lambda35格式的asc文件，波长从start递减至end
+    '''
+    wavelength_array = np.arange(start, end-step/2, -step, dtype=float)
+    absorbance_array = absorption_spectrum(wavelength_array, height=height, seed=seed)
+    name = os.path.basename(asc_file).replace('.asc', '')
+    with open(asc_file, 'w', newline='\n') as asc:
+        asc.write(ASC_HEADER.format(name=name, n=len(wavelength_array)))
+        values = np.column_stack([wavelength_array, absorbance_array]).ravel().tolist()
+        asc.write(('%.6f\t%.6f\n'*len(wavelength_array)) % tuple(values))
+    return asc_file
+
+def make_asc_dir(filedir, n_files, step=1, rate=0.05, **kwargs):
+    '''
+    生成一组浓度变化实验的asc文件：y.asc为初始光谱，其余文件名为时间(min)
+    吸收峰高度按一级动力学衰减
+    '''
+    os.makedirs(filedir, exist_ok=True)
+    paths = [write_asc(os.path.join(filedir, 'y.asc'), step=step, seed=0, **kwargs)]
+    for t in range(1, n_files):
+        paths.append(write_asc(
+            os.path.join(filedir, '%d.asc' % t), step=step,
+            height=np.exp(-rate*t), seed=t, **kwargs))
+    return paths
+
+def reflectance_spectrum(wavelength_array, edge=400, width=15, seed=None):
+    '''
+    在吸收边edge(nm)处由低到高的S形反射率(T%)加噪声
+    '''
+    rng = np.random.default_rng(seed)
+    reflectance = 5 + 85/(1+np.exp(-(wavelength_array-edge)/width))
+    return reflectance + rng.normal(0, 0.1, len(wavelength_array))
+
+def write_drs(drs_file, start=200, end=800, step=0.5, edge=400, scans=1, seed=None):
+    '''
+    写入一个Shimadzu UV-2550格式的DRS数据文件（GBK编码），波长从start递增至end
+    scans大于1时模拟多次扫描拼接导出的文件，数据段重复scans次
+    '''
+    wavelength_array = np.arange(start, end+step/2, step, dtype=float)
+    reflectance_array = reflectance_spectrum(wavelength_array, edge, seed=seed)
+    values = np.column_stack([wavelength_array, reflectance_array]).ravel().tolist()
+    lines = ('%.2f,%.3f\n'*len(wavelength_array)) % tuple(values)
+    with open(drs_file, 'w', encoding='gbk', newline='\n') as txt:
+        txt.write('"Storage 193957 - RawData - F:\\\\synthetic\\\\%s.spc"\n' % os.path.basename(drs_file))
+        txt.write('"波长(nm)","T%"\n')
+        for i in range(scans):
+            txt.write(lines)
+    return drs_file
+
+def make_drs_dir(filedir, n_files, step=0.5, **kwargs):
+    '''
+    生成n_files个DRS数据文件，吸收边在350~450nm之间变化
+    '''
+    os.makedirs(filedir, exist_ok=True)
+    edges = np.linspace(350, 450, n_files)
+    return [write_drs(os.path.join(filedir, '%d.txt' % i), step=step, edge=edges[i], seed=i, **kwargs)
+            for i in range(n_files)]
@@ -2,24 +2,73 @@
 处理数据时常用的计算方法
 '''
 import numpy as np
-from scipy import interpolate
-from scipy.optimize import curve_fit
-from matplotlib import cm, colors
 
-def logistic_fit(x, y):
+# scipy和matplotlib导入较慢，在用到的函数中再导入，只解析数据时不必加载
+
+def logistic_fit(x, y, method='curve_fit', p0=None, return_params=False):
     '''
     拟合logistic函数,P(t)=KP_0exp(rt)/(K+P_0(exp(rt)-1)),P_0为初值，K为终值
     返回函数y=f(x)
+    method为'curve_fit'时从p0（默认为(1, 1)）开始迭代拟合；
+    为'jacobian'时使用解析雅可比矩阵，p0默认取线性化拟合的结果，迭代失败时退回线性化拟合；
+    为'linear'时对logit变换后的数据作线性拟合，不迭代
+    p0可传入上一个样品的参数(t, r)以加快收敛
+    return_params为True时同时返回参数(t, r)
     '''
     def func(z, t, r):
         return (k*p*np.exp(r*z+t))/(k+p*(np.exp(r*z+t)-1))
 
+    def stable_func(z, t, r):
+        # 与func等价，改写为k/(1+c*exp(-s))以免exp溢出
+        with np.errstate(over='ignore'):
+            return k/(1+(k-p)/p*np.exp(-(r*z+t)))
+
+    def jac(z, t, r):
+        # df/ds = f(1-f/k), s = rz+t
+        f = stable_func(z, t, r)
+        dfds = f*(1-f/k)
+        return np.column_stack([dfds, dfds*z])
+
+    from scipy.optimize import curve_fit
     k = max(y)
     p = y[-1]
     i = np.where(y==k)[0][0]
 
-    popt, pcov = curve_fit(func, x[i:], y[i:])
-    return func(x, *popt)
+    if method == 'curve_fit':
+        popt, pcov = curve_fit(func, x[i:], y[i:], p0=p0)
+        fit = func(x, *popt)
+    elif method in ('jacobian', 'linear'):
+        guess = logistic_guess(x[i:], y[i:], k, p)
+        popt = guess
+        if method == 'jacobian':
+            try:
+                popt, pcov = curve_fit(
+                    stable_func, x[i:], y[i:], p0=guess if p0 is None else p0, jac=jac)
+            except RuntimeError:
+                pass
+        fit = stable_func(x, *popt)
+    else:
+        raise ValueError('method应为curve_fit、jacobian或linear')
+    if return_params:
+        return fit, tuple(popt)
+    return fit
+
+def logistic_guess(x, y, k, p):
+    '''
+    logistic函数的线性化拟合：ln(y(k-p)/(p(k-y))) = rx+t
+    在0<y<k的数据点上作加权线性回归，权重(y(1-y/k))^2抵消logit变换对误差的放大
+    返回(t, r)，可用数据点不足时返回(1, 1)
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.log(y*(k-p)/(p*(k-y)))
+    ok = np.isfinite(s)
+    if ok.sum() < 2 or not 0 < p < k:
+        return (1.0, 1.0)
+    x, y, s = x[ok], y[ok], s[ok]
+    w = (y*(1-y/k))**2
+    xm, sm = np.average(x, weights=w), np.average(s, weights=w)
+    r = np.sum(w*(x-xm)*(s-sm))/np.sum(w*(x-xm)**2)
+    return (sm-r*xm, r)
 
 def num_differ(x, y):
     '''
@@ -32,45 +81,188 @@ def num_differ(x, y):
     y2 = np.append(y[0], y[:-1])
     return (y1-y2)/(x1-x2)
 
+def linear_fit(x, y):
+    '''
+    一元线性回归，返回斜率k、截距b和相关系数r
+    '''
+    xm, ym = x.mean(), y.mean()
+    dx, dy = x-xm, y-ym
+    sxx, sxy, syy = np.dot(dx, dx), np.dot(dx, dy), np.dot(dy, dy)
+    k = sxy/sxx
+    r = min(max(sxy/np.sqrt(sxx*syy), -1.0), 1.0)
+    return k, ym-k*xm, r
+
+def window_linregress(x, y, centers, half_widths):
+    '''
+    用前缀和一次算出多个窗口内的一元线性回归
+    每个窗口为以centers为中心、半宽为half_widths的切片[c-i, c+i)，centers与half_widths按numpy规则广播
+    返回斜率k、截距b和相关系数r的数组，超出数组范围的窗口结果为nan
+    '''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # 先减去均值，减小前缀和相减时的舍入误差
+    xm, ym = x.mean(), y.mean()
+    dx, dy = x-xm, y-ym
+    def prefix(v):
+        return np.concatenate([[0.], np.cumsum(v)])
+    sx, sy, sxx, sxy, syy = map(prefix, (dx, dy, dx*dx, dx*dy, dy*dy))
+
+    centers, half_widths = np.broadcast_arrays(centers, half_widths)
+    start, end = centers-half_widths, centers+half_widths
+    valid = (start >= 0) & (end < len(x)) & (half_widths > 0)
+    start, end = np.where(valid, start, 0), np.where(valid, end, 0)
+    n = end-start
+    Sx, Sy = sx[end]-sx[start], sy[end]-sy[start]
+    Sxx, Sxy, Syy = sxx[end]-sxx[start], sxy[end]-sxy[start], syy[end]-syy[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n*Sxy - Sx*Sy
+        varx = n*Sxx - Sx*Sx
+        vary = n*Syy - Sy*Sy
+        k = cov/varx
+        b = (Sy-k*Sx)/n + ym - k*xm
+        r = np.clip(cov/np.sqrt(varx*vary), -1, 1)
+    k[~valid] = b[~valid] = r[~valid] = np.nan
+    return k, b, r
+
+def check_grid_range(x, x0):
+    '''
+    检查x0是否在单调网格x的范围内（含端点），超出或x的数据点少于2个时抛出ValueError
+    '''
+    if len(x) < 2:
+        raise ValueError('{} | 光谱的数据点少于2个，无法取值'.format(x0))
+    low, high = (x[0], x[-1]) if x[0] <= x[-1] else (x[-1], x[0])
+    if np.ndim(x0):
+        out = (np.asarray(x0) < low).any() or (np.asarray(x0) > high).any()
+    else:
+        out = not low <= x0 <= high
+    if out:
+        raise ValueError('{} | 输入波长范围应在{}~{}nm内'.format(x0, low, high))
+
+def cubic_spline(x, y):
+    '''
+    在单调网格x上对y作三次样条插值，y的最后一维与x对应，返回插值函数
+    '''
+    from scipy.interpolate import CubicSpline
+    if x[0] > x[-1]:
+        x, y = x[::-1], y[..., ::-1]
+    return CubicSpline(x, y, axis=-1)
+
+def grid_lookup(x, y, x0, kind='nearest'):
+    '''
+    在单调的网格x上用二分查找取出x0处的y值
+    y的最后一维与x对应，x0可以是数或数组，返回数组的最后一维与x0对应
+    kind为'nearest'时取最近的网格点，距离相同时取在x中靠前的点；
+    为'linear'时线性插值；为'cubic'时三次样条插值
+    x0超出x的范围时抛出ValueError
+    '''
+    check_grid_range(x, x0)
+    if kind == 'cubic':
+        return cubic_spline(x, y)(x0)[()]
+    ascending = x[0] <= x[-1]
+    if not ascending:
+        x, y = x[::-1], y[..., ::-1]
+    j = x.searchsorted(x0)
+    if np.ndim(j):
+        j = np.clip(j, 1, len(x)-1)
+    else:
+        j = min(max(j, 1), len(x)-1)
+    left, right = x[j-1], x[j]
+    if kind == 'nearest':
+        if ascending:
+            closer_left = x0-left <= right-x0
+        else:
+            closer_left = x0-left < right-x0
+        if np.ndim(j):
+            return y[..., np.where(closer_left, j-1, j)]
+        return y[..., j-1 if closer_left else j][()]
+    elif kind == 'linear':
+        w = (x0-left)/(right-left)
+        return (y[..., j-1]*(1-w) + y[..., j]*w)[()]
+    else:
+        raise ValueError('kind应为nearest、linear或cubic')
+
+def band_average(x, y, low, high):
+    '''
+    求x在[low, high]范围内的网格点上y的平均值，x为单调的网格
+    y的最后一维与x对应，low、high可以是数或数组
+    '''
+    if x[0] > x[-1]:
+        x, y = x[::-1], y[..., ::-1]
+    csum = np.concatenate([np.zeros(y.shape[:-1]+(1,)), np.cumsum(y, axis=-1)], axis=-1)
+    i = np.searchsorted(x, low, side='left')
+    j = np.searchsorted(x, high, side='right')
+    if (np.asarray(j-i) <= 0).any():
+        raise ValueError('{}~{} | 波段内没有数据点'.format(low, high))
+    return (csum[..., j]-csum[..., i])/(j-i)
+
+def minmax_decimate(x, y, buckets):
+    '''
+    绘制大量数据点的曲线时抽稀数据：把y的最后一维分成buckets段，每段只按原顺序保留最小值和最大值两点，
+    曲线的外形在每段（约一个像素宽）内保持不变
+    x为一维数组，y的最后一维与x对应，返回每行各自的x和y，数据点不多于2*buckets时不抽稀
+    '''
+    m = y.shape[-1]
+    if m <= 2*buckets:
+        return np.broadcast_to(x, y.shape), y
+    size = -(-m//buckets)
+    # 用最后一个值补齐最后一段，不影响该段的最值
+    pad = np.repeat(y[..., -1:], size*buckets-m, axis=-1)
+    blocks = np.concatenate([y, pad], axis=-1).reshape(y.shape[:-1]+(buckets, size))
+    imin, imax = blocks.argmin(axis=-1), blocks.argmax(axis=-1)
+    base = np.arange(buckets)*size
+    idx = np.stack([base+np.minimum(imin, imax), base+np.maximum(imin, imax)], axis=-1)
+    idx = np.minimum(idx.reshape(y.shape[:-1]+(2*buckets,)), m-1)
+    return x[idx], np.take_along_axis(y, idx, axis=-1)
+
+def get_cmap(colormap):
+    '''
+    由名字取得matplotlib内建的colormap，传入Colormap时直接返回
+    '''
+    import matplotlib
+    from matplotlib import cm, colors
+    if isinstance(colormap, colors.Colormap):
+        return colormap
+    if hasattr(matplotlib, 'colormaps'):
+        return matplotlib.colormaps[colormap]
+    return cm.get_cmap(colormap)
+
 def cmap_interpolation(colormap, n):
     '''
     第一个参数为matplotlib内建的colormap
     第二个参数是要提取的颜色个数
-    使用分段插值法计算出对应的颜色
+    使用分段插值法计算出对应的颜色，所有取色位置一次算出
     返回含有n个颜色的列表
     '''
-    if not isinstance(colormap, colors.Colormap):
-        colormap = cm.get_cmap(colormap)
+    from matplotlib import colors
+    colormap = get_cmap(colormap)
 
     if hasattr(colormap, 'colors'):
         # 将ListedColormap转化为LinearSegmentedColormap
         colormap = colors.LinearSegmentedColormap.from_list('', colormap.colors)
 
     cdict = colormap._segmentdata
+    positions = np.linspace(0, 1, n)
     rgblist = []
     for key in sorted(cdict, reverse=True):
-        positions = np.linspace(0, 1, n)
-        values = []
-        i = 0
-        for position in positions:
-            while 1:
-                if cdict[key][i][0] <= position <= cdict[key][i+1][0]:
-                    f = interpolate.interp1d(
-                        [cdict[key][i][0], cdict[key][i+1][0]],
-                        [cdict[key][i][2], cdict[key][i+1][1]]
-                        )
-                    values.append(f(position))
-                    break
-                elif i < len(cdict[key]):
-                    i += 1
-                else:
-                    break
-        rgblist.append(values)
-
-    return [(rgblist[0][i], rgblist[1][i], rgblist[2][i]) for i in range(n)]
+        if callable(cdict[key]):
+            # 用函数定义的通道直接求值
+            rgblist.append(np.clip(cdict[key](positions), 0, 1))
+            continue
+        segment = np.asarray(cdict[key], dtype=float)
+        x = segment[:, 0]
+        # 每个位置所在的分段[x[i], x[i+1]]，位置恰好在分段点上时取左边的分段
+        i = np.clip(np.searchsorted(x, positions, side='left')-1, 0, len(x)-2)
+        x_lo, x_hi = x[i], x[i+1]
+        y_lo, y_hi = segment[i, 2], segment[i+1, 1]
+        slope = (y_hi-y_lo)/(x_hi-x_lo)
+        # 与np.interp一致，位置恰好在分段右端点时直接取端点值
+        rgblist.append(np.where(positions == x_hi, y_hi, slope*(positions-x_lo) + y_lo))
+
+    return list(zip(rgblist[0].tolist(), rgblist[1].tolist(), rgblist[2].tolist()))
 
 def get_color_list(color, n):
     '将颜色参数转化为颜色列表'
+    from matplotlib import colors
     colorlist = []
     if colors.is_color_like(color):
         # 给一个颜色则按透明度递减产生颜色列表
@@ -0,0 +1,140 @@
+'''
+已解析数据的磁盘缓存，避免重复解析同一批光谱文件
+'''
+import os, hashlib, zipfile
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.uvvis_cache')
+DEFAULT_MAX_BYTES = 512*2**20
+# 缓存格式和解析结果的版本，解析器或保存的内容改变时加1，版本不同的旧缓存视为未命中
+FORMAT_VERSION = 2
+
+class SpectrumCache:
+    '''
+    以源文件的绝对路径为键，把解析得到的数组保存为cache_dir中的npz文件
+    源文件的修改时间或大小改变、或缓存由其他FORMAT_VERSION写入时缓存失效
+    缓存总大小超过max_bytes时，按最近最少使用的顺序删除旧的缓存
+    '''
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total = None #缓存总大小，第一次写入时统计
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __repr__(self):
+        return 'SpectrumCache:'+self.cache_dir
+
+    def __getstate__(self):
+        # 传给子进程时不带上本进程统计的缓存总大小
+        state = self.__dict__.copy()
+        state['_total'] = None
+        return state
+
+    def entry_path(self, file):
+        '源文件对应的缓存文件路径'
+        key = hashlib.sha1(os.path.abspath(file).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key+'.npz')
+
+    def get(self, file):
+        '''
+        取出file的缓存数组元组，无缓存或缓存已失效时返回None
+        '''
+        stat = os.stat(file)
+        entry = self.entry_path(file)
+        try:
+            with np.load(entry) as npz:
+                if (npz['version'] != FORMAT_VERSION or
+                        npz['mtime'] != stat.st_mtime_ns or npz['size'] != stat.st_size):
+                    return None
+                arrays = tuple(npz['arr_%d'%i] for i in range(len(npz.files)-3))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        # 用缓存文件的修改时间记录最近一次使用，其他进程可能已将其删除
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+        return arrays
+
+    def put(self, file, arrays):
+        '''
+        保存file解析得到的数组元组
+        '''
+        stat = os.stat(file)
+        entry = self.entry_path(file)
+        old_size = _size(entry)
+        tmp = '%s.%d.tmp'%(entry, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.savez(f, *arrays, version=FORMAT_VERSION, mtime=stat.st_mtime_ns, size=stat.st_size)
+        os.replace(tmp, entry)
+
+        if self._total is None:
+            self._total = self.total_bytes()
+        else:
+            self._total += _size(entry) - old_size
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def load(self, file, parse):
+        '''
+        返回file的数组元组，缓存命中时直接读缓存，否则用parse(file)解析后写入缓存
+        '''
+        arrays = self.get(file)
+        if arrays is None:
+            arrays = parse(file)
+            self.put(file, arrays)
+        return arrays
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.cache_dir)
+                if entry.name.endswith('.npz') and entry.is_file()]
+
+    def _stats(self):
+        '''
+        (修改时间, 大小, 路径)的列表，列出后已被其他进程删除的缓存不计入
+        '''
+        stats = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            stats.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return stats
+
+    def total_bytes(self):
+        '缓存文件的总大小'
+        return sum(size for mtime, size, path in self._stats())
+
+    def evict(self):
+        '''
+        按最近最少使用的顺序删除缓存，直到总大小不超过max_bytes
+        多个进程共用同一缓存文件夹时，其他进程删除的缓存直接跳过
+        '''
+        entries = sorted(self._stats())
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total = total
+
+    def clear(self):
+        '删除全部缓存'
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        self._total = 0
+
+def _size(path):
+    '文件大小，文件不存在（如已被其他进程删除）时为0'
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
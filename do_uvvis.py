@@ -1,5 +1,5 @@
-'命令行版程序，已弃用'
-import traceback
+'命令行版程序，已弃用，请改用无交互的uvvis_cli.py'
+import os, traceback
 import matplotlib.pyplot as plt
 import uvvis
 
@@ -41,9 +41,7 @@ def handle_concentration_change():
     cc_datas = uvvis.read_ccdatas(cc_filedir, wavelength=wavelength)
     uvvis.draw_concentration_change(cc_datas, **kwargs)
     plt.show()
-    if not cc_filedir.endswith('\\'):
-        cc_filedir += '\\'
-    xlsx_path = cc_filedir + 'rusult.xlsx'
+    xlsx_path = os.path.join(cc_filedir, 'rusult.xlsx')
     if input('\n是否保存数据？（y/n）\n') == 'y':
         uvvis.write_xlsx(xlsx_path, cc_datas)
         print('\n已保存至：%s\n' % xlsx_path)
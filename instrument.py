@@ -0,0 +1,173 @@
+'''
+可选的耗时统计：记录读取、拟合、导出和绘图各步骤的调用次数、耗时和读取的字节数
+enable()时才把被统计的函数替换为计时的包装函数，disable()后恢复原函数，未启用时没有任何额外开销
+只统计当前进程（包括其中的线程）的调用，进程池子进程中的调用不计入
+耗时为包含内部调用的总耗时，例如read_ascdir的耗时包含其中各次read_asc的耗时
+'''
+import os, json, time, threading, functools, importlib
+from contextlib import contextmanager
+import numpy as np
+
+# (模块, 属性, 是否统计第一个参数所指文件的字节数)，属性可以是“类名.方法名”
+TARGETS = [
+    ('uvvis', 'read_asc', False),
+    ('uvvis', '_parse_asc', True),
+    ('uvvis', 'read_ascfiles', False),
+    ('uvvis', 'read_ascdir', False),
+    ('uvvis', 'read_ccdatas', False),
+    ('uvvis', 'read_multi_ccdatas', False),
+    ('uvvis', 'get_concentration_change', False),
+    ('uvvis', 'get_concentration_changes', False),
+    ('uvvis', 'write_uvvis_datas', False),
+    ('uvvis', 'write_cc_datas', False),
+    ('uvvis', 'draw_uvvis', False),
+    ('uvvis', 'draw_concentration_change', False),
+    ('uvvisdrs', 'read_raw', False),
+    ('uvvisdrs', '_parse_raw', True),
+    ('uvvisdrs', 'UvvisDrsData._logistic_fit', False),
+    ('uvvisdrs', 'UvvisDrsData.calculate_eg', False),
+    ('uvvisdrs', 'UvvisDrsData.write_txt', False),
+    ('uvvisdrs', 'UvvisDrsData.write_xlsx', False),
+    ('uvvisdrs', 'UvvisDrsData.draw_hvfr', False),
+    ('uvvisdrs', 'write_drs_xlsx', False),
+    ('uvvisdrs', 'fit_batch', False),
+    ('calculation', 'logistic_fit', False),
+    ('calculation', 'window_linregress', False),
+    ('calculation', 'linear_fit', False),
+    ('calculation', 'cmap_interpolation', False),
+    ('matplotlib.figure', 'Figure.savefig', False),
+    ('matplotlib.backends.backend_agg', 'FigureCanvasAgg.draw', False),
+]
+
+_lock = threading.Lock()
+_events = [] #(步骤名, 开始时间, 耗时, 线程id, 字节数)
+_originals = {} #(所属对象, 属性名) -> 原函数
+_origin = time.perf_counter()
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError, ValueError):
+        return 0
+
+def _wrap(func, stage, count_bytes):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter()-t0
+            nbytes = _file_size(args[0]) if count_bytes and args else 0
+            with _lock:
+                _events.append((stage, t0, elapsed, threading.get_ident(), nbytes))
+    return wrapper
+
+def _resolve(module_name, attr):
+    '''
+    返回(属性所在的模块或类, 属性名)
+    '''
+    owner = importlib.import_module(module_name)
+    *path, name = attr.split('.')
+    for part in path:
+        owner = getattr(owner, part)
+    return owner, name
+
+def is_enabled():
+    return bool(_originals)
+
+def enable(targets=None):
+    '''
+    开始统计，targets默认为TARGETS，重复调用不会重复包装
+    '''
+    for module_name, attr, count_bytes in targets or TARGETS:
+        try:
+            owner, name = _resolve(module_name, attr)
+        except (ImportError, AttributeError):
+            continue
+        if (owner, name) in _originals:
+            continue
+        func = owner.__dict__[name]
+        _originals[(owner, name)] = func
+        stage = '%s.%s'%(module_name.split('.')[-1], attr)
+        setattr(owner, name, _wrap(func, stage, count_bytes))
+
+def disable():
+    '''
+    停止统计并恢复原函数，已记录的数据保留到reset()
+    '''
+    while _originals:
+        (owner, name), func = _originals.popitem()
+        setattr(owner, name, func)
+
+def reset():
+    '清空已记录的数据'
+    global _origin
+    with _lock:
+        _events.clear()
+        _origin = time.perf_counter()
+
+@contextmanager
+def enabled(targets=None):
+    '''
+    with enabled(): 在with块内统计
+    '''
+    enable(targets)
+    try:
+        yield
+    finally:
+        disable()
+
+def summary():
+    '''
+    返回{步骤名: 统计}，统计包括调用次数calls、总耗时total、平均mean、
+    中位数p50、p90、p99、最大值max（单位s）以及读取的字节数bytes
+    '''
+    with _lock:
+        events = list(_events)
+    stages = {}
+    for stage, t0, elapsed, tid, nbytes in events:
+        times, total_bytes = stages.get(stage, ([], 0))
+        times.append(elapsed)
+        stages[stage] = (times, total_bytes+nbytes)
+    result = {}
+    for stage, (times, total_bytes) in stages.items():
+        times = np.array(times)
+        p50, p90, p99 = np.percentile(times, [50, 90, 99])
+        result[stage] = {
+            'calls': len(times), 'total': times.sum(), 'mean': times.mean(),
+            'p50': p50, 'p90': p90, 'p99': p99, 'max': times.max(), 'bytes': total_bytes}
+    return result
+
+def format_summary():
+    '''
+    按总耗时从大到小排列的文字报告（单位ms）
+    '''
+    stats = summary()
+    if not stats:
+        return '没有记录到调用'
+    lines = ['%-36s %7s %10s %9s %9s %9s %9s %10s' % (
+        '步骤', 'calls', 'total', 'mean', 'p50', 'p90', 'p99', 'MB')]
+    for stage, s in sorted(stats.items(), key=lambda item: -item[1]['total']):
+        lines.append('%-36s %7d %10.1f %9.2f %9.2f %9.2f %9.2f %10.2f' % (
+            stage, s['calls'], s['total']*1e3, s['mean']*1e3,
+            s['p50']*1e3, s['p90']*1e3, s['p99']*1e3, s['bytes']/2**20))
+    return '\n'.join(lines)
+
+def write_trace(file_path):
+    '''
+    保存为Chrome trace event格式的JSON文件，可在chrome://tracing或Perfetto中查看
+    '''
+    with _lock:
+        events = list(_events)
+    pid = os.getpid()
+    trace = []
+    for stage, t0, elapsed, tid, nbytes in events:
+        event = {
+            'name': stage, 'cat': stage.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': (t0-_origin)*1e6, 'dur': elapsed*1e6}
+        if nbytes:
+            event['args'] = {'bytes': nbytes}
+        trace.append(event)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
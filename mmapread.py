@@ -0,0 +1,78 @@
+'''
+用内存映射读取很大的光谱数据文件
+在文件中定位表头的最后一行后，把其后的数值区分块解析到预先分配好的数组中，
+不把整个文件读入内存，也不会为每个数值创建Python对象
+'''
+import mmap
+import numpy as np
+
+# 依次尝试的表头编码，仪器导出的文件一般为GBK
+ENCODINGS = ('utf-8-sig', 'gbk')
+CHUNK_BYTES = 2**20
+
+def detect_encoding(data, encodings=ENCODINGS):
+    '''
+    返回encodings中第一个能解码data的编码，都不能解码时抛出ValueError
+    '''
+    for encoding in encodings:
+        try:
+            data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    raise ValueError('无法识别文件编码，已尝试：%s'%', '.join(encodings))
+
+def _chunks(buf, start, chunk_bytes):
+    '''
+    从start开始把buf切成约chunk_bytes大小、在换行处断开的块，产出(起点, 终点)
+    '''
+    size = len(buf)
+    while start < size:
+        end = buf.find(b'\n', min(start+chunk_bytes, size-1))
+        end = size if end == -1 else end+1
+        yield start, end
+        start = end
+
+def read_columns(file, sentinel, ncols=2, delimiter=None, encodings=ENCODINGS, chunk_bytes=CHUNK_BYTES):
+    '''
+    读取file中sentinel之后的数值区，返回各列数组组成的列表
+    sentinel为编译好的bytes正则表达式，匹配表头的最后一行（含换行符），
+    其前面的表头必须能用encodings中的某个编码解码，否则抛出ValueError
+    delimiter为列分隔符（bytes），为None时以空白字符分隔
+    数值区不是规整的ncols列数值时抛出ValueError，找不到sentinel时返回空数组
+    '''
+    with open(file, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return [np.array([]) for i in range(ncols)]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            match = sentinel.search(buf)
+            if not match:
+                return [np.array([]) for i in range(ncols)]
+            detect_encoding(buf[:match.start()], encodings)
+
+            # 第一遍只数行数，用于预先分配数组
+            bounds = list(_chunks(buf, match.end(), chunk_bytes))
+            rows = sum(buf[start:end].count(b'\n') for start, end in bounds) + 1
+            # 各列单独分配，只保留其中一列时其余列的内存可以释放
+            columns = [np.empty(rows) for i in range(ncols)]
+
+            # 第二遍逐块解析，每块的临时数据不超过chunk_bytes的量级
+            n = 0
+            for start, end in bounds:
+                chunk = buf[start:end].strip()
+                if not chunk:
+                    continue
+                if delimiter is not None:
+                    chunk = chunk.replace(delimiter, b' ')
+                k = chunk.count(b'\n') + 1
+                # 遇到无法解析的内容时numpy 2抛出ValueError，较早的版本只给出警告并截断，由长度检查处理
+                try:
+                    values = np.fromstring(chunk.decode('ascii'), sep=' ')
+                except ValueError:
+                    values = None
+                if values is None or values.size != k*ncols:
+                    raise ValueError('%s数据段不是%d列数值'%(file, ncols))
+                for column, value in zip(columns, values.reshape(k, ncols).T):
+                    column[n:n+k] = value
+                n += k
+    return [column[:n] for column in columns]
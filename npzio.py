@@ -0,0 +1,103 @@
+'''
+以npz格式保存和读取UvvisData、ConcentrationChangeData和UvvisDrsData
+npz文件不压缩，读取时各数组直接以内存映射的方式打开，不需要重新解析或拟合
+'''
+import json, struct, zipfile
+import numpy as np
+
+from uvvis import UvvisData, ConcentrationChangeData
+from uvvisdrs import UvvisDrsData
+
+# 各类型需要保存的数组和数值属性
+ARRAYS = {
+    'UvvisData': ['wavelength_array', 'absorbance_array'],
+    'ConcentrationChangeData': ['c_array', 'time_array'],
+    'UvvisDrsData': ['wavelength_array', 'reflectance_array', 'hvfr2_logi_fit', 'hvfr12_logi_fit'],
+}
+SCALARS = {
+    'UvvisData': [],
+    'ConcentrationChangeData': ['init_absor', 'wavelength'],
+    'UvvisDrsData': ['egd', 'kd', 'bd', 'rd', 'egi', 'ki', 'bi', 'ri'],
+}
+
+def write_npz(file_path, datas):
+    '''
+    将一个数据或数据列表写入npz文件
+    '''
+    single = not isinstance(datas, (list, tuple))
+    if single:
+        datas = [datas]
+    arrays, meta = {}, []
+    for i, data in enumerate(datas):
+        kind = type(data).__name__
+        if kind not in ARRAYS:
+            raise TypeError('Must UvvisData, ConcentrationChangeData or UvvisDrsData')
+        item = {'type': kind, 'name': data.name}
+        for attr in SCALARS[kind]:
+            value = getattr(data, attr)
+            item[attr] = list(value) if isinstance(value, tuple) else float(value)
+        meta.append(item)
+        for attr in ARRAYS[kind]:
+            arrays['%d.%s'%(i, attr)] = np.asarray(getattr(data, attr))
+    arrays['meta'] = np.frombuffer(
+        json.dumps({'single': single, 'datas': meta}, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)
+    with open(file_path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def _map_members(file_path, mmap):
+    '''
+    返回npz文件中数组名到数组的字典
+    mmap为True时用写时复制的内存映射打开（可修改，修改不写回文件），否则读入内存
+    '''
+    if not mmap:
+        with np.load(file_path) as npz:
+            return {key: npz[key] for key in npz.files}
+    arrays = {}
+    with zipfile.ZipFile(file_path) as zf, open(file_path, 'rb') as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('%s是压缩的npz文件，无法内存映射'%file_path)
+            # 本地文件头长30字节，之后是文件名和扩展字段，再之后才是数组的.npy数据
+            f.seek(info.header_offset+26)
+            name_len, extra_len = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset+30+name_len+extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            key = info.filename[:-len('.npy')]
+            if int(np.prod(shape)) == 0:
+                arrays[key] = np.empty(shape, dtype)
+            else:
+                arrays[key] = np.memmap(
+                    file_path, dtype=dtype, mode='c', offset=f.tell(),
+                    shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+def read_npz(file_path, mmap=True):
+    '''
+    读取write_npz写入的文件，返回数据或数据列表（与写入时一致）
+    mmap为True时数组以写时复制的内存映射方式打开，
+    可以直接继续修改（如传给watch_ascdir后用add_point替换数据点），修改只在内存中，不会写回文件
+    '''
+    arrays = _map_members(file_path, mmap)
+    meta = json.loads(bytes(arrays.pop('meta')).decode('utf-8'))
+    datas = []
+    for i, item in enumerate(meta['datas']):
+        kind = item['type']
+        values = {attr: arrays['%d.%s'%(i, attr)] for attr in ARRAYS[kind]}
+        for attr in SCALARS[kind]:
+            value = item[attr]
+            values[attr] = tuple(value) if isinstance(value, list) else value
+        if kind == 'UvvisData':
+            data = UvvisData(values['wavelength_array'], values['absorbance_array'], item['name'])
+        elif kind == 'ConcentrationChangeData':
+            data = ConcentrationChangeData(
+                np.array([]), [], item['name'], values['init_absor'], values['wavelength'])
+            data.c_array = values['c_array']
+            data.time_array = values['time_array']
+        else:
+            data = UvvisDrsData.from_results(**values, name=item['name'])
+        datas.append(data)
+    return datas[0] if meta['single'] else datas
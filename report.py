@@ -0,0 +1,130 @@
+'''
+无界面批量出图：绘制uv-vis图、浓度变化图和DRS图并保存到文件夹
+并行出图的子进程选用Agg后端，在本进程依次出图时沿用当前后端，不改变交互式界面的后端和已打开的图像
+每张图保存后立即关闭，绘制成千上万张图时内存也不会增长
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import uvvis, uvvisdrs
+
+FORMATS = ('png', 'svg', 'pdf')
+
+def use_agg():
+    '''
+    选用Agg后端并返回pyplot，在导入pyplot之前调用时不会加载交互式后端
+    用作子进程的initializer，不在调用者的进程中调用，以免切换交互式界面的后端
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _draw(kind, data, kwargs):
+    '''
+    按kind绘图并返回figure，data为路径时先读取数据
+    '''
+    if kind == 'uvvis':
+        if isinstance(data, str):
+            data = uvvis.read_ascdir(data)
+        return uvvis.draw_uvvis(data, **kwargs)
+    if kind == 'cc':
+        return uvvis.draw_concentration_change(data, **kwargs)
+    if kind == 'drs':
+        if kwargs:
+            raise TypeError('DRS图不接受绘图参数：%s'%', '.join(kwargs))
+        if isinstance(data, str):
+            data = uvvisdrs.read_raw(data)
+        return data.draw_hvfr()
+    raise ValueError("kind必须为'uvvis'、'cc'或'drs'，而不是%r"%kind)
+
+def save_figure(fig, out_dir, name, formats=('png',), dpi=None):
+    '''
+    把fig保存为out_dir/name.格式并关闭fig，返回保存的文件列表
+    '''
+    import matplotlib.pyplot as plt
+    try:
+        files = []
+        for fmt in formats:
+            path = os.path.join(out_dir, '%s.%s'%(name, fmt))
+            fig.savefig(path, dpi=dpi)
+            files.append(path)
+        return files
+    finally:
+        plt.close(fig)
+
+def _render_job(job, out_dir, formats, dpi):
+    '''
+    绘制一张图并保存为各格式，返回(文件列表, None)，出错时返回(None, 异常)
+    '''
+    kind, name, data = job[:3]
+    kwargs = job[3] if len(job) > 3 else {}
+    try:
+        return save_figure(_draw(kind, data, kwargs), out_dir, name, formats, dpi), None
+    except Exception as e:
+        return None, e
+
+def _render_jobs(jobs, out_dir, formats, dpi):
+    return [_render_job(job, out_dir, formats, dpi) for job in jobs]
+
+def render(jobs, out_dir, formats=('png',), workers=None, dpi=None, progress=None):
+    '''
+    批量绘图并保存到out_dir，out_dir不存在时自动创建
+    jobs为(kind, name, data)或(kind, name, data, kwargs)元组的列表，kwargs传给绘图函数（'drs'不接受kwargs）：
+    kind为'uvvis'时data为UvvisData列表、SpectrumCollection或asc文件夹路径，用draw_uvvis绘图
+    kind为'cc'时data为ConcentrationChangeData列表，用draw_concentration_change绘图
+    kind为'drs'时data为UvvisDrsData或DRS原始文件路径，用UvvisDrsData.draw_hvfr绘图
+    data为路径时在子进程中读取，避免把数据传给子进程
+    图像保存为out_dir/name.格式，formats为'png'、'svg'、'pdf'中的一个或多个
+    workers为并行绘图的进程数，子进程使用Agg后端；为None或1时在本进程依次绘制，沿用本进程的后端
+    progress(已完成数, 总数, name)在每张图完成后调用
+    单张图出错不会中断其他图
+    返回按jobs顺序排列的已保存文件路径列表，以及出错的(name, 异常)列表
+    '''
+    jobs = list(jobs)
+    if isinstance(formats, str):
+        formats = (formats,)
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError('不支持的图像格式：%s'%fmt)
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = [None]*len(jobs)
+    if workers and workers > 1:
+        # 每个任务包含若干张图，减少进程间通信的开销
+        size = max(1, min(16, len(jobs)//(workers*4)))
+        chunks = [range(i, min(i+size, len(jobs))) for i in range(0, len(jobs), size)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=use_agg) as executor:
+            futures = {
+                executor.submit(_render_jobs, [jobs[i] for i in chunk], out_dir, formats, dpi): chunk
+                for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures.pop(future)
+                for i, result in zip(chunk, future.result()):
+                    results[i] = result
+                    done += 1
+                    if progress:
+                        progress(done, len(jobs), jobs[i][1])
+    else:
+        for i, job in enumerate(jobs):
+            results[i] = _render_job(job, out_dir, formats, dpi)
+            if progress:
+                progress(i+1, len(jobs), job[1])
+
+    files, failures = [], []
+    for job, (paths, e) in zip(jobs, results):
+        if e is None:
+            files.extend(paths)
+        else:
+            failures.append((job[1], e))
+    return files, failures
+
+def render_drs(source, out_dir, formats=('png',), workers=None, dpi=None, progress=None):
+    '''
+    为一批DRS原始文件各绘制一张(hvF(R))^n-hv图，source的用法见uvvisdrs.find_raw_files
+    文件在子进程中读取和拟合，图像以文件名（不含扩展名）命名，其余参数见render
+    '''
+    jobs = [('drs', os.path.splitext(os.path.basename(f))[0], f)
+            for f in uvvisdrs.find_raw_files(source)]
+    return render(jobs, out_dir, formats, workers, dpi, progress)
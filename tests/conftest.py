@@ -0,0 +1,7 @@
+'''
+测试从仓库根目录导入各模块，合成数据由benchmark/synthetic.py生成
+'''
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmark')]
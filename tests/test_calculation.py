@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import calculation, uvvis
+
+@pytest.mark.parametrize('n', [0, 1])
+@pytest.mark.parametrize('kind', ['nearest', 'linear', 'cubic'])
+def test_short_spectrum_raises_value_error(n, kind):
+    data = uvvis.UvvisData(np.arange(500.0, 500.0-n, -1), np.zeros(n), 'short')
+    with pytest.raises(ValueError):
+        data.get_absorbance(500, kind)
+
+def test_out_of_range_raises_value_error():
+    x = np.arange(800.0, 199.0, -1)
+    with pytest.raises(ValueError):
+        calculation.grid_lookup(x, np.zeros_like(x), 900)
+    assert calculation.grid_lookup(x, x*2, 485) == 970
+
+def test_header_only_asc_raises_value_error(tmp_path):
+    from synthetic import ASC_HEADER
+    asc = tmp_path/'1.asc'
+    asc.write_text(ASC_HEADER.format(name='1', n=601))
+    data = uvvis.read_asc(str(asc))
+    assert len(data.wavelength_array) == 0
+    with pytest.raises(ValueError):
+        data.get_absorbance(485)
@@ -0,0 +1,32 @@
+import json
+import pytest
+
+import uvvis_cli, uvvisdrs
+from synthetic import make_drs_dir
+
+def read_summary(out):
+    def reject(token):
+        raise ValueError('summary.json中有不合法的%s'%token)
+    with open(str(out/'summary.json'), encoding='utf-8') as f:
+        return json.loads(f.read(), parse_constant=reject)
+
+@pytest.mark.filterwarnings('ignore')
+def test_drs(tmp_path):
+    make_drs_dir(str(tmp_path/'drs'), 2)
+    out = tmp_path/'out'
+    assert uvvis_cli.main(['drs', str(tmp_path/'drs'), '-o', str(out), '-f', 'png', 'xlsx', '-j', '1']) == 0
+    summary = read_summary(out)
+    assert len(summary['results']) == 2
+    assert len(summary['outputs']) == 3
+
+def test_non_finite_band_gap(tmp_path, monkeypatch):
+    make_drs_dir(str(tmp_path/'drs'), 1)
+    nan = float('nan')
+    def fit_batch(files, *args, **kwargs):
+        return [uvvisdrs.BandGapResult(files[0], nan, float('inf'), nan, nan, nan, nan, nan, nan)], []
+    monkeypatch.setattr(uvvisdrs, 'fit_batch', fit_batch)
+    out = tmp_path/'out'
+    assert uvvis_cli.main(['drs', str(tmp_path/'drs'), '-o', str(out), '-f', 'xlsx', '-j', '1']) == 1
+    summary = read_summary(out)
+    assert summary['results'][0]['egd'] is None and summary['results'][0]['egi'] is None
+    assert [f['path'] for f in summary['failures']] == [str(out/'band_gaps.xlsx')]
@@ -0,0 +1,40 @@
+import os
+import numpy as np
+
+import uvvis
+from datacache import SpectrumCache
+from synthetic import make_asc_dir
+
+def test_evict_skips_entries_removed_by_other_process(tmp_path):
+    cache = SpectrumCache(str(tmp_path/'cache'))
+    for i in range(4):
+        src = tmp_path/('%d.txt'%i)
+        src.write_text(str(i))
+        cache.put(str(src), (np.arange(100.0),))
+    listed = cache._entries()
+    # 列出之后、stat之前缓存被其他进程删除
+    os.remove(listed[0].path)
+    cache._entries = lambda: listed
+    cache.max_bytes = 0
+    cache.evict()
+    assert os.listdir(cache.cache_dir) == []
+
+def test_get_and_put_tolerate_missing_entry(tmp_path):
+    cache = SpectrumCache(str(tmp_path/'cache'))
+    src = tmp_path/'1.txt'
+    src.write_text('1')
+    cache.put(str(src), (np.arange(3.0),))
+    os.remove(cache.entry_path(str(src)))
+    assert cache.get(str(src)) is None
+    cache.put(str(src), (np.arange(3.0),))
+    assert (cache.get(str(src))[0] == np.arange(3.0)).all()
+
+def test_concurrent_eviction_reports_no_failures(tmp_path):
+    make_asc_dir(str(tmp_path/'data'), 60)
+    for _ in range(2):
+        # 缓存上限只够几个文件，各进程不断互相删除对方的缓存
+        cache = SpectrumCache(str(tmp_path/'cache'), max_bytes=40000)
+        errors = []
+        datas = uvvis.read_ascdir(str(tmp_path/'data'), workers=8, processes=True, errors=errors, cache=cache)
+        assert errors == []
+        assert len(datas) == 60
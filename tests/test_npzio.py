@@ -0,0 +1,28 @@
+import numpy as np
+
+import npzio, uvvis
+from synthetic import make_asc_dir, write_asc
+
+def test_resume_watch_from_npz(tmp_path):
+    data_dir = tmp_path/'data'
+    make_asc_dir(str(data_dir), 3)
+    cc_data = uvvis.get_concentration_change(uvvis.read_ascdir(str(data_dir)), 485, 'data')
+    npz = str(tmp_path/'cc.npz')
+    npzio.write_npz(npz, cc_data)
+    recorded = cc_data.c_array.copy()
+
+    calls = []
+    def stop():
+        calls.append(None)
+        if len(calls) == 1:
+            # 已记录的时间点的文件被重新写入
+            write_asc(str(data_dir/'1.asc'), height=0.2, seed=1)
+        return len(calls) > 1
+    resumed = npzio.read_npz(npz)
+    updates = list(uvvis.watch_ascdir(str(data_dir), 485, cc_data=resumed, interval=0, stop=stop))
+    assert len(updates) == 1
+    assert list(resumed.time_array) == [1, 2]
+    assert resumed.c_array[0] < recorded[0]
+    assert resumed.c_array[1] == recorded[1]
+    # 修改不写回npz文件
+    assert (npzio.read_npz(npz).c_array == recorded).all()
@@ -0,0 +1,37 @@
+import os
+import matplotlib
+import pytest
+
+import report, uvvisdrs
+from synthetic import make_drs_dir
+
+@pytest.fixture
+def svg_session():
+    '用非Agg的后端代表交互式界面，结束后恢复原来的后端'
+    backend = matplotlib.get_backend()
+    matplotlib.use('svg')
+    import matplotlib.pyplot as plt
+    fig = plt.figure()
+    yield plt, fig
+    plt.close('all')
+    matplotlib.use(backend)
+
+@pytest.mark.filterwarnings('ignore')
+def test_serial_render_keeps_caller_backend(tmp_path, svg_session):
+    plt, fig = svg_session
+    files = make_drs_dir(str(tmp_path/'drs'), 2)
+    saved, failures = report.render_drs(files, str(tmp_path/'figures'))
+    assert failures == [] and len(saved) == 2
+    results, failures = uvvisdrs.fit_batch(files, figure_dir=str(tmp_path/'figures'))
+    assert failures == [] and len(results) == 2
+    assert matplotlib.get_backend() == 'svg'
+    assert plt.fignum_exists(fig.number)
+    assert plt.get_fignums() == [fig.number]
+
+@pytest.mark.filterwarnings('ignore')
+def test_parallel_fit_batch_saves_figures(tmp_path, svg_session):
+    files = make_drs_dir(str(tmp_path/'drs'), 2)
+    results, failures = uvvisdrs.fit_batch(files, workers=2, figure_dir=str(tmp_path/'figures'))
+    assert failures == [] and len(results) == 2
+    assert all(os.path.exists(p) for f in files for p in uvvisdrs.figure_paths(f, str(tmp_path/'figures')))
+    assert matplotlib.get_backend() == 'svg'
@@ -0,0 +1,21 @@
+import os, re
+import pytest
+
+import uvvisdrs
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example', 'uvvisdrs')
+
+def documented_eg(sample):
+    '读取_result.txt中记录的(直接带隙, 间接带隙)'
+    with open(os.path.join(EXAMPLE, sample+'_result.txt')) as f:
+        return [float(e) for e in re.findall(r'energy=([\d.]+)eV', f.read())]
+
+@pytest.mark.filterwarnings('ignore')
+@pytest.mark.parametrize('sample', ['1', '3'])
+@pytest.mark.parametrize('n', [2, 0.5])
+def test_scan_matches_documented_band_gap(sample, n):
+    drs = uvvisdrs.read_raw(os.path.join(EXAMPLE, sample+'.txt'))
+    drs.refit(n, scan=True)
+    eg, k, b, r = drs.direct if n == 2 else drs.indirect
+    assert r > 0.99 and k > 0
+    assert eg == pytest.approx(documented_eg(sample)[0 if n == 2 else 1], abs=0.05)
@@ -0,0 +1,17 @@
+import numpy as np
+
+import uvvis
+from synthetic import ASC_HEADER, write_asc
+
+def test_header_only_file_is_retried(tmp_path):
+    write_asc(str(tmp_path/'y.asc'), seed=0)
+    # 仪器已写入表头、还未写入数据
+    (tmp_path/'1.asc').write_text(ASC_HEADER.format(name='1', n=601))
+    calls = []
+    def stop():
+        calls.append(None)
+        if len(calls) == 1:
+            write_asc(str(tmp_path/'1.asc'), height=0.5, seed=1)
+        return len(calls) > 1
+    updates = [cc.time_array.copy() for cc in uvvis.watch_ascdir(str(tmp_path), 485, interval=0, stop=stop)]
+    assert [list(t) for t in updates] == [[], [1]]
@@ -1,68 +1,256 @@
 '''
 处理紫外可见分光光度法的实验数据
 '''
-import os, xlsxwriter, re
-from itertools import cycle
-from collections import Counter
+import os, re, time
+from itertools import cycle, chain
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 import numpy as np
-import matplotlib.pyplot as plt
 
-import calculation
+# matplotlib.pyplot和xlsxwriter在绘图和导出的函数中再导入，只读取和计算时不必加载
+import calculation, mmapread
 
 CH = ['YouYuan', 'SimHei'] #中文字体幼圆
 D_MARKERS = ['o', 'v', 's', 'p', 'h', '*', 'D', 'P', 'X', '8']
 D_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+XLSX_MAX_COLS = 16384 #excel表格的列数上限
+DATA_SENTINEL = re.compile(rb'^#DATA\r?\n', re.M) #asc文件数据段的起始标记
 
 class UvvisData:
     '''
     紫外可见光谱数据，一份数据包含了波长数组、吸光度数组和数据名
+    dtype不为None时吸光度数组以该类型存储（如np.float32），波长数组保持原样
     '''
-    def __init__(self, wavelength_array, absorbance_array, name):
+    __slots__ = ('wavelength_array', 'absorbance_array', 'name', '_spline')
+
+    def __init__(self, wavelength_array, absorbance_array, name, dtype=None):
         self.wavelength_array = wavelength_array
-        self.absorbance_array = absorbance_array
+        self.absorbance_array = absorbance_array if dtype is None else np.asarray(absorbance_array, dtype)
         self.name = name
+        self._spline = None
 
     def __repr__(self):
         return 'UvvisData:'+self.name
 
-    def get_absorbance(self, wavelength):
+    def get_absorbance(self, wavelength, kind='nearest'):
         '''
-        取出光谱数据中某一波长的吸光度
+        取出光谱数据中某一波长的吸光度，wavelength可以是数或数组
+        kind为'nearest'时取最近的数据点，为'linear'时线性插值，为'cubic'时三次样条插值
+        波长数组单调，查找使用二分法
         '''
-        if self.wavelength_array.min() < wavelength and wavelength < self.wavelength_array.max():
-            # 搜索近似值
-            dif = abs(self.wavelength_array-wavelength)
-            i = dif.argmin()
-            return self.absorbance_array[i]
-            # return self.absorbance_array[np.where(self.wavelength_array == wavelength)[0][0]]
-        else:
-            raise ValueError('{} | 输入波长范围应在{}~{}nm内'.format(wavelength, self.wavelength_array[-1], self.wavelength_array[0]))
+        if kind != 'cubic':
+            return calculation.grid_lookup(self.wavelength_array, self.absorbance_array, wavelength, kind)
+        calculation.check_grid_range(self.wavelength_array, wavelength)
+        if self._spline is None:
+            # 样条系数只计算一次
+            self._spline = calculation.cubic_spline(self.wavelength_array, self.absorbance_array)
+        return self._spline(wavelength)[()]
 
 class ConcentrationChangeData:
     '''
     根据吸光度变化计算得到物质浓度变化
     包含物质浓度比例（C/C0）数组、时间数组的数据
+    time_array转换为numpy数组，dtype不为None时C/C0数组以该类型存储
     '''
-    def __init__(self, absor_array, time_array, name, init_absor=None, wavelength=0):
+    __slots__ = ('init_absor', 'c_array', 'time_array', 'name', 'wavelength')
+
+    def __init__(self, absor_array, time_array, name, init_absor=None, wavelength=0, dtype=None):
         if init_absor:
             self.init_absor = init_absor
         else:
             self.init_absor = absor_array[0]
         self.c_array = absor_array/self.init_absor
-        self.time_array = time_array
+        if dtype is not None:
+            self.c_array = self.c_array.astype(dtype)
+        self.time_array = np.asarray(time_array)
         self.name = name
         self.wavelength = wavelength
 
     def __repr__(self):
         return 'ConcentrationChangeData:'+self.name
 
-def read_asc(asc_file):
+    def add_point(self, time, absorbance):
+        '''
+        按时间顺序插入一个时间点的吸光度，已有该时间点时替换原来的数值
+        其余数据点不重新计算
+        '''
+        i = np.searchsorted(self.time_array, time)
+        if i < len(self.time_array) and self.time_array[i] == time:
+            self.c_array[i] = absorbance/self.init_absor
+        else:
+            self.time_array = np.insert(self.time_array, i, time)
+            self.c_array = np.insert(self.c_array, i, absorbance/self.init_absor)
+
+    def set_init_absor(self, init_absor):
+        '''
+        更换初始吸光度，并按比例换算C/C0数组
+        '''
+        self.c_array = self.c_array*(self.init_absor/init_absor)
+        self.init_absor = init_absor
+
+class SpectrumCollection:
+    '''
+    一组紫外可见光谱数据的列式存储，absorbance_matrix每行为一条光谱，names为对应的数据名数组
+    各光谱波长网格一致时，wavelength_array为共用的一维波长数组
+    网格不一致时，wavelength_array为与absorbance_matrix同形的二维数组，
+    每行的有效长度记录在lengths中，不足的部分以nan填充
+    '''
+    def __init__(self, wavelength_array, absorbance_matrix, names, lengths=None):
+        self.wavelength_array = np.asarray(wavelength_array, dtype=float)
+        self.absorbance_matrix = np.ascontiguousarray(absorbance_matrix, dtype=float)
+        self.names = np.array(names, dtype=object)
+        if lengths is None:
+            lengths = np.full(len(self.names), self.absorbance_matrix.shape[1])
+        self.lengths = np.asarray(lengths)
+
+    @classmethod
+    def from_uvvis_datas(cls, uvvis_datas):
+        '''
+        由UvvisData列表创建，传入SpectrumCollection时直接返回
+        '''
+        if isinstance(uvvis_datas, cls):
+            return uvvis_datas
+        if not len(uvvis_datas):
+            raise TypeError('请输入uvvis数据')
+        names = [data.name for data in uvvis_datas]
+        lengths = np.array([len(data.wavelength_array) for data in uvvis_datas])
+        if (lengths == lengths[0]).all():
+            absorbances = np.stack([data.absorbance_array for data in uvvis_datas])
+            grid = uvvis_datas[0].wavelength_array
+            if all(data.wavelength_array is grid for data in uvvis_datas):
+                # read_ascfiles读取的光谱共用同一个波长数组，不必逐个比较
+                return cls(grid, absorbances, names)
+            wavelengths = np.stack([data.wavelength_array for data in uvvis_datas])
+            if (wavelengths == wavelengths[0]).all():
+                return cls(wavelengths[0], absorbances, names)
+            return cls(wavelengths, absorbances, names, lengths)
+        wavelengths = np.full((len(lengths), lengths.max()), np.nan)
+        absorbances = np.full((len(lengths), lengths.max()), np.nan)
+        for i, data in enumerate(uvvis_datas):
+            wavelengths[i, :lengths[i]] = data.wavelength_array
+            absorbances[i, :lengths[i]] = data.absorbance_array
+        return cls(wavelengths, absorbances, names, lengths)
+
+    def __repr__(self):
+        return 'SpectrumCollection:%d spectra'%len(self)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        '''
+        整数索引返回UvvisData，切片或数组索引返回新的SpectrumCollection
+        '''
+        if isinstance(index, (int, np.integer)):
+            n = self.lengths[index]
+            wavelength_array = self.wavelength_array if self.is_uniform else self.wavelength_array[index]
+            return UvvisData(wavelength_array[:n], self.absorbance_matrix[index, :n], self.names[index])
+        wavelength_array = self.wavelength_array if self.is_uniform else self.wavelength_array[index]
+        return SpectrumCollection(
+            wavelength_array, self.absorbance_matrix[index], self.names[index], self.lengths[index])
+
+    @property
+    def is_uniform(self):
+        '各光谱的波长网格是否一致'
+        return self.wavelength_array.ndim == 1
+
+    def to_uvvis_datas(self):
+        '转换为UvvisData列表'
+        return list(self)
+
+    def get_absorbance(self, wavelength, kind='nearest'):
+        '''
+        取出每条光谱在某一波长的吸光度，返回与names对应的数组
+        '''
+        return self.get_absorbances([wavelength], kind)[:, 0]
+
+    def get_absorbances(self, wavelengths, kind='nearest'):
+        '''
+        一次取出多个波长的吸光度，返回形状为(光谱数, 波长数)的数组
+        wavelengths的元素为波长，或(起始, 终止)波长元组，此时取该波段内各数据点吸光度的平均值
+        kind为'nearest'时取最近的数据点，为'linear'时线性插值，为'cubic'时三次样条插值
+        '''
+        points = [i for i, w in enumerate(wavelengths) if np.isscalar(w)]
+        bands = [i for i, w in enumerate(wavelengths) if not np.isscalar(w)]
+        result = np.empty((len(self), len(wavelengths)))
+        if self.is_uniform:
+            rows = [(slice(None), self.wavelength_array, self.absorbance_matrix)]
+        else:
+            rows = [(i, w[:n], a[:n]) for i, (w, a, n) in enumerate(
+                zip(self.wavelength_array, self.absorbance_matrix, self.lengths))]
+        for i, w, a in rows:
+            if points:
+                result[i, points] = calculation.grid_lookup(
+                    w, a, [wavelengths[k] for k in points], kind)
+            if bands:
+                low, high = np.sort([wavelengths[k] for k in bands], axis=1).T
+                result[i, bands] = calculation.band_average(w, a, low, high)
+        return result
+
+    def slice_wavelength(self, start, end):
+        '''
+        截取start~end nm范围内的数据，返回新的SpectrumCollection
+        '''
+        low, high = min(start, end), max(start, end)
+        w = self.wavelength_array
+        with np.errstate(invalid='ignore'):
+            mask = (w >= low) & (w <= high)
+        if self.is_uniform:
+            return SpectrumCollection(w[mask], self.absorbance_matrix[:, mask], self.names)
+        # 把每行范围内的数据移到行首，再截掉多余的列
+        lengths = mask.sum(axis=1)
+        order = np.argsort(~mask, axis=1, kind='stable')[:, :lengths.max()]
+        wavelengths = np.take_along_axis(w, order, axis=1)
+        absorbances = np.take_along_axis(self.absorbance_matrix, order, axis=1)
+        pad = np.arange(order.shape[1]) >= lengths[:, None]
+        wavelengths[pad] = np.nan
+        absorbances[pad] = np.nan
+        return SpectrumCollection(wavelengths, absorbances, self.names, lengths)
+
+def read_asc(asc_file, fast=True, cache=None, dtype=None):
     '''
     读取一个asc文件，返回UvvisData的实例
     文件名为样品的浓度变化对应的时间
+    fast为True时一次性解析整个数据段，格式不符时退回逐行解析
+    cache为datacache.SpectrumCache实例时优先读取缓存
+    dtype为吸光度数组的存储类型，见UvvisData
     '''
     if not asc_file.endswith('.asc'):
         return
+    if cache is None:
+        wavelength, absorbance = _parse_asc(asc_file, fast)
+    else:
+        wavelength, absorbance = cache.load(asc_file, lambda f: _parse_asc(f, fast))
+    name = re.split(r'/|\\', asc_file.replace('.asc', ''))[-1]
+    return UvvisData(wavelength, absorbance, name, dtype)
+
+def _parse_asc(asc_file, fast=True):
+    '''
+    解析asc文件，返回波长数组和吸光度数组
+    '''
+    if fast:
+        try:
+            return _parse_asc_block(asc_file)
+        except ValueError:
+            pass
+    return _parse_asc_lines(asc_file)
+
+def _parse_asc_block(asc_file):
+    '''
+    定位#DATA后，用内存映射分块解析数据段
+    数据段不是规整的两列数值时抛出ValueError
+    '''
+    wavelength, absorbance = mmapread.read_columns(asc_file, DATA_SENTINEL)
+    return wavelength, absorbance
+
+def _parse_asc_lines(asc_file):
+    '''
+    逐行解析asc文件的数据段
+    '''
     with open(asc_file, 'r') as asc:
         ascline = '1'
         while ascline != '':
@@ -76,14 +264,24 @@ def read_asc(asc_file):
             wavelength.append(float(ascline.split('\t')[0]))
             absorbance.append(float(ascline.split('\t')[1]))
             ascline = asc.readline()
-    name = re.split(r'/|\\', asc_file.replace('.asc', ''))[-1]
-    return UvvisData(np.array(wavelength), np.array(absorbance), name)
+    return np.array(wavelength), np.array(absorbance)
 
-def read_ascdir(filedir):
+class AscReadError(Exception):
     '''
-    读取给定目录中所有的asc文件，返回UvvisData的实例列表
+    批量读取asc文件时有文件读取失败
+    failures为(文件路径, 异常)的列表，datas为其余读取成功的UvvisData列表
+    '''
+    def __init__(self, failures, datas=None):
+        self.failures = failures
+        self.datas = datas
+        super().__init__('以下asc文件读取失败：\n'+'\n'.join(
+            '%s | %s'%(f, e) for f, e in failures))
+
+def sort_ascfiles(files):
+    '''
+    从文件名列表中挑出asc文件并排序
+    y.asc在最前，其余按文件名中的数字排序，文件名不全为数字时按字典序排序
     '''
-    files = os.listdir(filedir)
     y = ''
     ascfiles = []
     for f in files:
@@ -97,123 +295,374 @@ def read_ascdir(filedir):
     except ValueError:
         ascfiles.sort()
     if y:ascfiles.insert(0,y)
+    return ascfiles
+
+def _try_read_asc(asc_file, cache=None, dtype=None):
+    '''
+    读取asc文件，返回(UvvisData, None)，出错时返回(None, 异常)
+    '''
+    try:
+        return read_asc(asc_file, cache=cache, dtype=dtype), None
+    except Exception as e:
+        return None, e
+
+def read_ascfiles(asc_files, workers=None, processes=False, errors=None, cache=None, dtype=None):
+    '''
+    读取多个asc文件，返回与asc_files顺序一致的UvvisData列表
+    workers为并行读取的线程数，processes为True时改用进程池，workers为None或1时依次读取
+    单个文件出错不会中断其余文件的读取：
+    errors为列表时，出错的(文件路径, 异常)追加到errors中，结果里略去该文件
+    否则全部读取完后抛出AscReadError
+    cache为datacache.SpectrumCache实例时优先读取缓存
+    dtype为吸光度数组的存储类型，见UvvisData；波长网格相同的光谱共用同一个波长数组
+    '''
+    read = partial(_try_read_asc, cache=cache, dtype=dtype)
+    if workers and workers > 1:
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool(max_workers=workers) as executor:
+            results = list(executor.map(read, asc_files))
+    else:
+        results = [read(f) for f in asc_files]
+
+    uvvis_datas, failures = [], []
+    grid = None
+    for f, (data, e) in zip(asc_files, results):
+        if e is None:
+            # 同一批文件的波长网格一般相同，只保留一份
+            if grid is not None and np.array_equal(data.wavelength_array, grid):
+                data.wavelength_array = grid
+            else:
+                grid = data.wavelength_array
+            uvvis_datas.append(data)
+        else:
+            failures.append((f, e))
+    if failures:
+        if errors is None:
+            raise AscReadError(failures, uvvis_datas)
+        errors.extend(failures)
+    return uvvis_datas
+
+def list_ascfiles(filedir):
+    '''
+    用一次os.scandir列出文件夹中的asc文件，返回按sort_ascfiles排序的完整路径列表
+    '''
+    with os.scandir(filedir) as entries:
+        names = [entry.name for entry in entries if entry.name.endswith('.asc') and entry.is_file()]
+    return [os.path.join(filedir, f) for f in sort_ascfiles(names)]
+
+def read_ascdir(filedir, workers=None, processes=False, errors=None, cache=None, dtype=None):
+    '''
+    读取给定目录中所有的asc文件，返回UvvisData的实例列表
+    workers、processes、errors、cache、dtype的用法见read_ascfiles
+    '''
+    ascfiles = list_ascfiles(filedir)
     if not ascfiles:
         raise TypeError('%s文件夹内无asc文件！'%filedir)
+    return read_ascfiles(ascfiles, workers, processes, errors, cache, dtype)
 
-    uvvis_datas = []
-    for f in ascfiles:
-        if f.endswith('.asc'):
-            uvvis_datas.append(read_asc(filedir+'\\'+f))
-    return uvvis_datas
+def discover_series(root):
+    '''
+    遍历一次root下所有层级的文件夹，找出直接含有asc文件的文件夹，每个文件夹为一组实验
+    返回按名字排序的(名字, asc文件路径列表)列表，名字为相对root的路径，各级之间用'/'连接
+    root本身含有asc文件时以root的文件夹名为名字，以'.'开头的隐藏文件夹和指向文件夹的符号链接被跳过（与os.walk相同）
+    '''
+    series = []
+    stack = [root]
+    while stack:
+        filedir = stack.pop()
+        names = []
+        with os.scandir(filedir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.'):
+                        stack.append(entry.path)
+                elif entry.name.endswith('.asc') and entry.is_file():
+                    names.append(entry.name)
+        if names:
+            if filedir == root:
+                name = os.path.basename(os.path.abspath(root))
+            else:
+                name = os.path.relpath(filedir, root).replace(os.sep, '/')
+            series.append((name, [os.path.join(filedir, f) for f in sort_ascfiles(names)]))
+    series.sort()
+    return series
+
+def _read_series(cc_filedir, workers, processes, cache, recursive=False):
+    '''
+    读取cc_filedir下各次级文件夹（不含符号链接）中的asc文件，recursive为True时改为读取discover_series找到的所有文件夹
+    返回文件夹名列表、与之对应的UvvisData列表的列表，以及读取失败的(文件路径, 异常)列表
+    全部文件读取失败的文件夹不在返回结果中
+    '''
+    if recursive:
+        found = discover_series(cc_filedir)
+        if not found:
+            raise TypeError('%s文件夹内无asc文件！'%cc_filedir)
+        folders = [name for name, paths in found]
+        series = [paths for name, paths in found]
+    else:
+        with os.scandir(cc_filedir) as entries:
+            folders = sorted(entry.name for entry in entries
+                             if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'))
+        series = []
+        for folder in folders:
+            folder_dir = os.path.join(cc_filedir, folder)
+            ascfiles = list_ascfiles(folder_dir)
+            if not ascfiles:
+                raise TypeError('%s文件夹内无asc文件！'%folder_dir)
+            series.append(ascfiles)
+
+    failures = []
+    uvvis_datas = read_ascfiles(
+        [f for paths in series for f in paths], workers, processes, failures, cache)
+    failed = set(f for f, e in failures)
 
-def read_ccdatas(cc_filedir, wavelength):
+    names, datas = [], []
+    i = 0
+    for folder, paths in zip(folders, series):
+        n = len([f for f in paths if f not in failed])
+        if n == 0:
+            # 该文件夹内的文件全部读取失败，已记录在failures中
+            continue
+        names.append(folder)
+        datas.append(uvvis_datas[i:i+n])
+        i += n
+    return names, datas, failures
+
+def read_ccdatas(cc_filedir, wavelength, workers=None, processes=False, errors=None, cache=None, recursive=False):
     '''
     从文件夹中读取所有asc文件中的数据，并包装成ConcentrationChangeData的列表
     输入的文件夹路径下应该全为次级文件夹，次级文件夹名字将为曲线标签
     次级文件夹内装有asc文件，并且asc文件名为时间
+    recursive为True时读取cc_filedir下任意层级中含有asc文件的文件夹，曲线标签为相对路径，见discover_series
+    所有次级文件夹的文件在同一个线程池/进程池中读取，参数用法见read_ascfiles
     '''
-    folders = os.listdir(cc_filedir)
-    cc_datas = []
-    for folder in folders:
-        if '.' not in folder:
-            cc_datas.append(
-                get_concentration_change(
-                    read_ascdir(cc_filedir+'\\'+folder),
-                    wavelength,
-                    folder))
+    names, datas, failures = _read_series(cc_filedir, workers, processes, cache, recursive)
+    cc_datas = [get_concentration_change(d, wavelength, name) for name, d in zip(names, datas)]
+    if failures:
+        if errors is None:
+            raise AscReadError(failures, cc_datas)
+        errors.extend(failures)
     return cc_datas
 
-def get_concentration_change(uvvis_datas, wavelength, name=''):
+def read_multi_ccdatas(cc_filedir, wavelengths, kind='nearest', workers=None, processes=False, errors=None, cache=None,
+                       recursive=False):
+    '''
+    与read_ccdatas相同，但一次取出多个特征波长（或波段）的浓度变化
+    返回列表的每个元素对应一个次级文件夹，是与wavelengths对应的ConcentrationChangeData列表
+    wavelengths、kind的用法见get_concentration_changes
     '''
-    传入UvvisData列表和相应的时间以及特征波长
-    得到浓度变化的数据
+    names, datas, failures = _read_series(cc_filedir, workers, processes, cache, recursive)
+    cc_datas = [get_concentration_changes(d, wavelengths, name, kind) for name, d in zip(names, datas)]
+    if failures:
+        if errors is None:
+            raise AscReadError(failures, cc_datas)
+        errors.extend(failures)
+    return cc_datas
+
+def get_concentration_change(uvvis_datas, wavelength, name='', kind='nearest'):
     '''
-    if not uvvis_datas:
+    传入UvvisData列表（或SpectrumCollection）和相应的时间以及特征波长
+    得到浓度变化的数据，kind的用法见UvvisData.get_absorbance
+    '''
+    if not len(uvvis_datas):
         raise TypeError('请输入uvvis数据')
-    absorlist = []
-    timelist = []
-    init_absor = None
-    for data in uvvis_datas:
-        if data.name == 'y':
-            init_absor = data.get_absorbance(wavelength)
-        else:
-            absorlist.append(data.get_absorbance(wavelength))
+    collection = SpectrumCollection.from_uvvis_datas(uvvis_datas)
+    absorbances = collection.get_absorbance(wavelength, kind)
+    is_y = collection.names == 'y'
+    init_absor = absorbances[is_y][-1] if is_y.any() else None
+    try:
+        timelist = [int(n) for n in collection.names[~is_y]]
+    except ValueError:
+        raise ValueError('文件名应为整数!')
+    return ConcentrationChangeData(absorbances[~is_y], timelist, name, init_absor, wavelength)
+
+def get_concentration_changes(uvvis_datas, wavelengths, name='', kind='nearest'):
+    '''
+    传入UvvisData列表（或SpectrumCollection）和多个特征波长，一次得到每个波长的浓度变化数据
+    wavelengths的元素为波长，或(起始, 终止)波长元组，此时使用该波段的平均吸光度
+    kind的用法见SpectrumCollection.get_absorbances
+    返回与wavelengths对应的ConcentrationChangeData列表
+    '''
+    if not len(uvvis_datas):
+        raise TypeError('请输入uvvis数据')
+    collection = SpectrumCollection.from_uvvis_datas(uvvis_datas)
+    absorbances = collection.get_absorbances(wavelengths, kind)
+    is_y = collection.names == 'y'
+    try:
+        timelist = [int(n) for n in collection.names[~is_y]]
+    except ValueError:
+        raise ValueError('文件名应为整数!')
+    cc_datas = []
+    for i, wavelength in enumerate(wavelengths):
+        init_absor = absorbances[is_y, i][-1] if is_y.any() else None
+        if not np.isscalar(wavelength):
+            wavelength = tuple(wavelength)
+        cc_datas.append(ConcentrationChangeData(
+            absorbances[~is_y, i], timelist, name, init_absor, wavelength))
+    return cc_datas
+
+def watch_ascdir(filedir, wavelength, cc_data=None, interval=5, idle_timeout=None, stop=None, kind='nearest', cache=None):
+    '''
+    跟踪仪器不断写入asc文件的文件夹，只解析新增或修改过的文件并加入浓度变化数据中
+    这是一个生成器，每当数据有更新时产出同一个ConcentrationChangeData实例
+    cc_data为已有的浓度变化数据时，其中已有的时间点（以及y.asc）不再重复解析
+    interval为扫描文件夹的间隔(s)；超过idle_timeout秒没有新文件，或stop()返回True时结束
+    无法解析或数据点不足的文件（如仍在写入中、仪器只写入了表头）会在下一次扫描时重试，
+    文件名不是整数的asc文件被忽略
+    '''
+    name = os.path.basename(os.path.normpath(filedir))
+    seen = {} #文件名 -> (修改时间, 大小)
+    first_scan = True
+    last_change = time.monotonic()
+    while True:
+        stats = {}
+        for entry in os.scandir(filedir):
+            if entry.name.endswith('.asc') and entry.is_file():
+                stat = entry.stat()
+                stats[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        updated = False
+        for f in sort_ascfiles([f for f in stats if seen.get(f) != stats[f]]):
+            if f == 'y.asc':
+                t = None
+            else:
+                try:
+                    t = int(f.split('.')[0])
+                except ValueError:
+                    seen[f] = stats[f]
+                    continue
+            if first_scan and cc_data is not None and (t is None or t in cc_data.time_array):
+                # 已包含在传入的数据中
+                seen[f] = stats[f]
+                continue
             try:
-                timelist.append(int(data.name))
-            except ValueError:
-                raise ValueError('文件名应为整数!')
-    return ConcentrationChangeData(np.array(absorlist), timelist, name, init_absor, wavelength)
+                # 数据点不足时get_absorbance抛出ValueError，视为尚未写完
+                absorbance = read_asc(os.path.join(filedir, f), cache=cache).get_absorbance(wavelength, kind)
+            except (OSError, ValueError):
+                continue
+            seen[f] = stats[f]
+            if t is None:
+                if cc_data is None:
+                    cc_data = ConcentrationChangeData(np.array([]), np.array([], dtype=int), name, absorbance, wavelength)
+                else:
+                    cc_data.set_init_absor(absorbance)
+            elif cc_data is None:
+                cc_data = ConcentrationChangeData(np.array([absorbance]), [t], name, wavelength=wavelength)
+            else:
+                cc_data.add_point(t, absorbance)
+            updated = True
+        first_scan = False
+
+        if updated:
+            last_change = time.monotonic()
+            yield cc_data
+        if stop is not None and stop():
+            return
+        if idle_timeout is not None and time.monotonic()-last_change > idle_timeout:
+            return
+        time.sleep(interval)
 
 def write_xlsx(file_path, datas):
     '将数据写入至excel表格'
-    if isinstance(datas[0], ConcentrationChangeData):
+    if isinstance(datas, SpectrumCollection):
+        write_uvvis_datas(file_path, datas)
+    elif isinstance(datas[0], ConcentrationChangeData):
         write_cc_datas(file_path, datas)
     elif isinstance(datas[0], UvvisData):
         write_uvvis_datas(file_path, datas)
     else:
         raise TypeError('Must UvvisData or ConcentrationChangeData')
 
-def write_cc_datas(file_path, cc_datas):
-    '将cc_datas数据写入至excel表格'
-    wb = xlsxwriter.Workbook(file_path)
+def write_cc_datas(file_path, cc_datas, constant_memory=False):
+    '''
+    将cc_datas数据写入至excel表格
+    constant_memory为True时使用xlsxwriter的constant_memory模式逐行写出，内存占用不随数据量增长
+    '''
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(file_path, {'constant_memory': constant_memory})
     ws = wb.add_worksheet()
     center = wb.add_format({'align': 'center'})
-    n = 1
+    ws.set_column('A:A', 10, center)
+    ws.set_column('B:C', 20, center)
+    n = 0
     for data in cc_datas:
-        ws.merge_range('A%d:C%d'%(n,n), data.name)
+        ws.merge_range(n,0, n,2, data.name)
         n+=1
-        ws.merge_range('A%d:B%d'%(n,n), 'initial_absorbance')
-        ws.write('C%d'%n, data.init_absor)
+        ws.merge_range(n,0, n,1, 'initial_absorbance')
+        ws.write(n,2, data.init_absor)
         n+=1
-        ws.merge_range('A%d:B%d'%(n,n), 'wavelength')
-        ws.write('C%d'%n, data.wavelength)
+        ws.merge_range(n,0, n,1, 'wavelength')
+        if np.isscalar(data.wavelength):
+            ws.write(n,2, data.wavelength)
+        else:
+            ws.write(n,2, '%s~%s'%data.wavelength)
         n+=1
-        ws.write_row('A%d'%n, ['time', 'C/C0', 'absorbance'])
+        ws.write_row(n,0, ['time', 'C/C0', 'absorbance'])
         n+=1
-        ws.write_column('A%d'%n, data.time_array)
-        ws.write_column('B%d'%n, data.c_array)
-        ws.write_column('C%d'%n, data.c_array*data.init_absor)
-        n+=len(data.time_array)+3
-    ws.set_column('A:A', 10, center)
-    ws.set_column('B:C', 20, center)
+        rows = np.column_stack([data.time_array, data.c_array, data.c_array*data.init_absor])
+        for row in rows.tolist():
+            ws.write_row(n,0, row)
+            n+=1
+        n+=3
     wb.close()
 
-def write_uvvis_datas(file_path, uvvis_datas):
-    '将uvvis_datas数据写入至excel表格'
-    wb = xlsxwriter.Workbook(file_path)
+def write_uvvis_datas(file_path, uvvis_datas, constant_memory=False):
+    '''
+    将uvvis_datas数据（UvvisData列表或SpectrumCollection）写入至excel表格
+    波长网格一致时每条光谱占combined表的一列，否则每条光谱在separated表中占两列
+    超出excel的列数上限时自动分到combined2、combined3...等多个表中
+    constant_memory为True时使用xlsxwriter的constant_memory模式逐行写出，内存占用不随数据量增长
+    '''
+    collection = SpectrumCollection.from_uvvis_datas(uvvis_datas)
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(file_path, {'constant_memory': constant_memory})
     center = wb.add_format({'align': 'center'})
-    c = Counter([
-        (data.wavelength_array[0], data.wavelength_array[-1], len(data.wavelength_array)) 
-        for data in uvvis_datas])
-    if len(c)==1:
-        ws1 = wb.add_worksheet('combined')
-        n = 0
-        ws1.write(0,n, 'name→')
-        ws1.write(1,n, 'nm')
-        ws1.write_column(2,n, uvvis_datas[0].wavelength_array)
-        n+=1
-        for data in uvvis_datas:
-            ws1.write_column(0,n, [data.name, 'A'])
-            ws1.write_column(2,n, data.absorbance_array)
-            n+=1
-        ws1.set_column(0,n, 10, center)
+    if collection.is_uniform:
+        # 第一列为波长，其余每列一条光谱
+        per_sheet = XLSX_MAX_COLS-1
+        for k, i in enumerate(range(0, len(collection), per_sheet)):
+            part = collection[i:i+per_sheet]
+            ws1 = wb.add_worksheet('combined' if k == 0 else 'combined%d'%(k+1))
+            ws1.set_column(0,len(part), 10, center)
+            ws1.write_row(0,0, ['name→']+list(part.names))
+            ws1.write_row(1,0, ['nm']+['A']*len(part))
+            rows = np.column_stack([part.wavelength_array, part.absorbance_matrix.T])
+            for r, row in enumerate(rows.tolist(), 2):
+                ws1.write_row(r,0, row)
     else:
-        ws2 = wb.add_worksheet('separated')
-        n = 0
-        for data in uvvis_datas:
-            ws2.write_row(0,n, ['name', data.name])
-            ws2.write_row(1,n, ['nm', 'A'])
-            ws2.write_column(2,n, data.wavelength_array)
-            ws2.write_column(2,n+1, data.absorbance_array)
-            n+=3
-        ws2.set_column(0,n, 10, center)
+        # 每条光谱占波长、吸光度两列，之间空一列
+        per_sheet = (XLSX_MAX_COLS+1)//3
+        for k, i in enumerate(range(0, len(collection), per_sheet)):
+            part = collection[i:i+per_sheet]
+            ws2 = wb.add_worksheet('separated' if k == 0 else 'separated%d'%(k+1))
+            n = len(part)
+            ws2.set_column(0,3*n, 10, center)
+            ws2.write_row(0,0, list(chain.from_iterable(['name', name, None] for name in part.names))[:-1])
+            ws2.write_row(1,0, ['nm', 'A', None]*(n-1)+['nm', 'A'])
+            length = part.lengths.max()
+            rows = np.full((length, 3*n-1), None, dtype=object)
+            rows[:, 0::3] = part.wavelength_array[:, :length].T
+            rows[:, 1::3] = part.absorbance_matrix[:, :length].T
+            # 长度不足的光谱补齐的nan留空
+            pad = np.arange(length)[:, None] >= part.lengths[None, :]
+            rows[:, 0::3][pad] = None
+            rows[:, 1::3][pad] = None
+            for r, row in enumerate(rows.tolist(), 2):
+                ws2.write_row(r,0, row)
     wb.close()
 
-def draw_uvvis(uvvis_datas, color=None, colormap=None, font=None, legend_loc=None, xlim=None, ylim=None, **kwargs):
+def draw_uvvis(uvvis_datas, color=None, colormap=None, font=None, legend_loc=None, xlim=None, ylim=None,
+               line_collection=False, decimate=False, **kwargs):
     '''
-    输入二维列表并绘制出uv-vis图
-    该列表第二维的元素也是一个列表，其中包含波长、吸光度的两个np数组
+    输入UvvisData列表或SpectrumCollection并绘制出uv-vis图
+    line_collection为True时适用于大量光谱：所有曲线作为一个LineCollection绘制，
+    按colormap（默认viridis）着色，并用颜色条代替图例
+    decimate为True时（仅line_collection模式）把每条曲线抽稀到约为图像宽度的像素数
     '''
+    if line_collection:
+        return _draw_uvvis_collection(
+            uvvis_datas, color, colormap, font, xlim, ylim, decimate, **kwargs)
+    import matplotlib.pyplot as plt
     fig = plt.figure()
     ax = fig.add_subplot(111)
     if font:
@@ -240,11 +689,64 @@ def draw_uvvis(uvvis_datas, color=None, colormap=None, font=None, legend_loc=Non
         ax.legend(handles, labels)
     return fig
 
+def _draw_uvvis_collection(uvvis_datas, color, colormap, font, xlim, ylim, decimate, **kwargs):
+    '''
+    draw_uvvis的LineCollection模式
+    '''
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import ListedColormap, Normalize
+    from matplotlib.cm import ScalarMappable
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    if font:
+        plt.rcParams['font.sans-serif'] = font
+
+    collection = SpectrumCollection.from_uvvis_datas(uvvis_datas)
+    n = len(collection)
+    buckets = int(fig.get_figwidth()*fig.dpi)
+    if collection.is_uniform:
+        x, y = collection.wavelength_array, collection.absorbance_matrix
+        if decimate:
+            x, y = calculation.minmax_decimate(x, y, buckets)
+        segments = np.stack(np.broadcast_arrays(x, y), axis=-1)
+    else:
+        segments = []
+        for data in collection:
+            x, y = data.wavelength_array, data.absorbance_array
+            if decimate:
+                x, y = calculation.minmax_decimate(x, y, buckets)
+            segments.append(np.column_stack([x, y]))
+
+    if color:
+        colorlist = calculation.get_color_list(color, n)
+    else:
+        colorlist = calculation.cmap_interpolation(colormap or 'viridis', n)
+    ax.add_collection(LineCollection(segments, colors=colorlist, **kwargs))
+    ax.autoscale_view()
+
+    # 颜色条的每一格对应一条光谱，刻度标注部分光谱的名字
+    mappable = ScalarMappable(
+        norm=Normalize(-0.5, n-0.5), cmap=ListedColormap(colorlist))
+    ticks = np.unique(np.linspace(0, n-1, min(n, 10)).round().astype(int))
+    colorbar = fig.colorbar(mappable, ax=ax, ticks=ticks)
+    colorbar.ax.set_yticklabels([str(collection.names[i]) for i in ticks])
+    colorbar.minorticks_off()
+
+    if xlim:ax.set_xlim(xlim[0], xlim[1])
+    if ylim:ax.set_ylim(ylim[0], ylim[1])
+    ax.set_xlabel('wavelength')
+    ax.set_ylabel('absorbance')
+    ax.set_title('UV-Vis')
+    return fig
+
 def draw_concentration_change(cc_datas, color=None, colormap=None, font=None, legend_loc=None, xlim=None, ylim=(-0.1, 1.1), **kwargs):
     '''
     传入ConcentrationChangeData实例的列表
     绘制物质浓度-时间图
     '''
+    import matplotlib.pyplot as plt
     fig = plt.figure()
     ax = fig.add_subplot(111)
     if font:
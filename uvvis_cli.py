@@ -0,0 +1,272 @@
+'''
+无交互的命令行批处理工具，取代已弃用的do_uvvis.py，适合在没有显示器的服务器上定时运行
+用法：
+python uvvis_cli.py uvvis '/data/*/asc' -o out -f png xlsx -j 8
+python uvvis_cli.py cc /data/series -w 485 -w 400:450 -o out -f png xlsx
+python uvvis_cli.py drs '/data/drs/*.txt' -o out -f png xlsx -j 8
+每次运行都在输出文件夹写入summary.json（或--summary指定的路径），记录输入、输出、结果和出错的文件，
+结果中的nan、inf记为null
+有文件出错时退出码为1
+'''
+import os, sys, glob, json, time, argparse
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+
+import uvvis, uvvisdrs, report, npzio
+from datacache import SpectrumCache
+
+FIGURE_FORMATS = report.FORMATS
+
+def expand_inputs(patterns):
+    '''
+    展开通配符，返回去重后按顺序排列的路径列表，不匹配任何文件的通配符原样保留以便报错
+    '''
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        for path in matches or [pattern]:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+def unique_names(names):
+    '''
+    重名时依次加上_2、_3...后缀
+    '''
+    seen, result = {}, []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        result.append(name if seen[name] == 1 else '%s_%d'%(name, seen[name]))
+    return result
+
+def parse_wavelength(s):
+    '''
+    '485'为特征波长，'400:450'为波段
+    '''
+    if ':' in s:
+        low, high = s.split(':')
+        return (float(low), float(high))
+    return float(s)
+
+def wavelength_label(wavelength):
+    if isinstance(wavelength, tuple):
+        return '%g-%gnm'%wavelength
+    return '%gnm'%wavelength
+
+def format_error(e):
+    return '%s: %s'%(type(e).__name__, e)
+
+def run_uvvis(args, summary):
+    '''
+    每个文件夹中的asc文件为一组，直接给出的asc文件合为一组，每组输出一张图和一个表格
+    '''
+    groups = []
+    loose = []
+    for path in expand_inputs(args.inputs):
+        if os.path.isdir(path):
+            files = uvvis.list_ascfiles(path)
+            groups.append([os.path.basename(os.path.normpath(path)), files])
+        elif path.endswith('.asc'):
+            loose.append(path)
+        else:
+            summary['failures'].append({'path': path, 'error': '不是asc文件或文件夹'})
+    if loose:
+        groups.append(['uvvis', loose])
+
+    names = unique_names([name for name, files in groups])
+    datas = []
+    for (name, files), unique in zip(groups, names):
+        errors = []
+        group = uvvis.read_ascfiles(files, args.workers, True, errors, args.cache)
+        summary['failures'].extend({'path': f, 'error': format_error(e)} for f, e in errors)
+        if group:
+            datas.append((unique, group))
+            summary['results'].append({'name': unique, 'spectra': len(group)})
+        elif not errors:
+            summary['failures'].append({'path': name, 'error': '文件夹内无asc文件'})
+
+    kwargs = {'line_collection': True, 'decimate': True} if args.line_collection else {}
+    write_outputs(args, summary, [('uvvis', name, group, kwargs) for name, group in datas])
+
+def run_cc(args, summary):
+    '''
+    每个输入文件夹下的次级文件夹为一组实验，每个输入文件夹和特征波长输出一张图，每个输入文件夹输出一个表格
+    '''
+    roots = []
+    for path in expand_inputs(args.inputs):
+        if os.path.isdir(path):
+            roots.append(path)
+        else:
+            summary['failures'].append({'path': path, 'error': '不是文件夹'})
+    names = unique_names([os.path.basename(os.path.normpath(root)) for root in roots])
+
+    jobs, tables = [], []
+    for root, name in zip(roots, names):
+        errors = []
+        try:
+            series = uvvis.read_multi_ccdatas(
+                root, args.wavelengths, args.kind, args.workers, True, errors, args.cache, args.recursive)
+        except Exception as e:
+            summary['failures'].append({'path': root, 'error': format_error(e)})
+            continue
+        summary['failures'].extend({'path': f, 'error': format_error(e)} for f, e in errors)
+        tables.append((name, [cc for ccs in series for cc in ccs]))
+        for i, wavelength in enumerate(args.wavelengths):
+            cc_datas = [cc[i] for cc in series]
+            jobs.append(('cc', '%s_%s'%(name, wavelength_label(wavelength)), cc_datas))
+            for cc in cc_datas:
+                summary['results'].append({
+                    'name': name, 'series': cc.name, 'wavelength': cc.wavelength,
+                    'time': np.asarray(cc.time_array, dtype=float).tolist(), 'c': cc.c_array.tolist()})
+    write_outputs(args, summary, jobs, tables)
+
+def write_outputs(args, summary, jobs, tables=None):
+    '''
+    按输出格式保存图像、xlsx表格和npz文件
+    tables为(文件名, 数据列表)的列表，默认每个任务一个表格
+    '''
+    if tables is None:
+        tables = [(name, data) for kind, name, data, *rest in jobs]
+    figure_formats = [f for f in args.formats if f in FIGURE_FORMATS]
+    if figure_formats and jobs:
+        files, failures = report.render(jobs, args.output, figure_formats, args.workers, args.dpi)
+        summary['outputs'].extend(files)
+        summary['failures'].extend({'path': name, 'error': format_error(e)} for name, e in failures)
+    for fmt, write in (('xlsx', uvvis.write_xlsx), ('npz', npzio.write_npz)):
+        if fmt not in args.formats:
+            continue
+        for name, datas in tables:
+            if not datas:
+                continue
+            path = os.path.join(args.output, '%s.%s'%(name, fmt))
+            try:
+                write(path, datas)
+                summary['outputs'].append(path)
+            except Exception as e:
+                summary['failures'].append({'path': path, 'error': format_error(e)})
+
+def run_drs(args, summary):
+    '''
+    每个DRS文件计算一次带隙，按需输出图像，xlsx为所有样品的带隙汇总表
+    '''
+    files = []
+    for path in expand_inputs(args.inputs):
+        files.extend(uvvisdrs.find_raw_files(path if os.path.isdir(path) else [path]))
+    if not files:
+        summary['failures'].append({'path': ' '.join(args.inputs), 'error': '没有找到DRS数据文件'})
+    figure_formats = [f for f in args.formats if f in FIGURE_FORMATS]
+    band_gaps, failures = uvvisdrs.fit_batch(
+        files, args.workers, cache=args.cache, fit_method=args.fit_method, warm_start=args.warm_start,
+        figure_dir=args.output if figure_formats else None, formats=figure_formats, dpi=args.dpi)
+    for result in band_gaps:
+        # read_raw以文件路径作为样品名
+        summary['results'].append(dict(result._asdict(), file=result.name))
+        if figure_formats:
+            summary['outputs'].extend(uvvisdrs.figure_paths(result.name, args.output, figure_formats))
+    summary['failures'].extend({'path': f, 'error': format_error(e)} for f, e in failures)
+    if 'xlsx' in args.formats and band_gaps:
+        path = os.path.join(args.output, 'band_gaps.xlsx')
+        try:
+            write_band_gaps(path, band_gaps)
+            summary['outputs'].append(path)
+        except Exception as e:
+            summary['failures'].append({'path': path, 'error': format_error(e)})
+
+def write_band_gaps(file_path, band_gaps):
+    '将BandGapResult列表写入excel表格，每个样品一行'
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(file_path)
+    ws = wb.add_worksheet('band_gaps')
+    ws.write_row(0, 0, uvvisdrs.BandGapResult._fields)
+    for i, result in enumerate(band_gaps):
+        ws.write_row(i+1, 0, result)
+    wb.close()
+
+def json_safe(obj):
+    '''
+    把nan、inf换成None，json.dumps会把它们写成不合法的NaN、Infinity
+    '''
+    if isinstance(obj, float):
+        return obj if np.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: json_safe(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_safe(value) for value in obj]
+    return obj
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='uvvis_cli', description='批量处理uv-vis光谱、浓度变化和DRS带隙，不需要图形界面')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(sub, formats):
+        sub.add_argument('inputs', nargs='+', help='输入文件或文件夹，支持通配符（包括**）')
+        sub.add_argument('-o', '--output', required=True, help='输出文件夹，不存在时自动创建')
+        sub.add_argument('-f', '--formats', nargs='+', choices=formats, default=['png'],
+                         help='输出格式，默认为png')
+        sub.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                         help='并行的进程数，默认为CPU核数，1为不并行')
+        sub.add_argument('--dpi', type=float, default=None, help='图像分辨率')
+        sub.add_argument('--summary', default=None,
+                         help='运行结果的JSON文件路径，默认为输出文件夹中的summary.json，-为打印到标准输出')
+
+    sub = subparsers.add_parser('uvvis', help='绘制吸光度-波长曲线并导出数据')
+    add_common(sub, FIGURE_FORMATS+('xlsx', 'npz'))
+    sub.add_argument('--line-collection', action='store_true', help='光谱很多时使用LineCollection并抽稀绘图')
+    sub.add_argument('--cache', action='store_true', help='使用解析结果的磁盘缓存')
+    sub.set_defaults(run=run_uvvis)
+
+    sub = subparsers.add_parser('cc', help='计算浓度变化曲线，输入为含次级文件夹的实验文件夹')
+    add_common(sub, FIGURE_FORMATS+('xlsx', 'npz'))
+    sub.add_argument('-w', '--wavelength', dest='wavelengths', type=parse_wavelength, action='append',
+                     required=True, help='特征波长(nm)，可多次指定，400:450表示取该波段的平均吸光度')
+    sub.add_argument('--kind', choices=['nearest', 'linear', 'cubic'], default='nearest',
+                     help='特征波长不在数据点上时的取值方法')
+    sub.add_argument('-r', '--recursive', action='store_true',
+                     help='把输入文件夹下任意层级中含有asc文件的文件夹都作为一组实验')
+    sub.add_argument('--cache', action='store_true', help='使用解析结果的磁盘缓存')
+    sub.set_defaults(run=run_cc)
+
+    sub = subparsers.add_parser('drs', help='计算DRS样品的带隙')
+    add_common(sub, FIGURE_FORMATS+('xlsx',))
+    sub.add_argument('--fit-method', choices=['curve_fit', 'jacobian', 'linear'], default='curve_fit',
+                     help='logistic拟合的方法')
+    sub.add_argument('--warm-start', action='store_true',
+                     help='以上一个样品的拟合参数作为下一个样品logistic拟合的初始值')
+    sub.add_argument('--cache', action='store_true', help='使用解析结果的磁盘缓存')
+    sub.set_defaults(run=run_drs)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'cache', False):
+        args.cache = SpectrumCache()
+    else:
+        args.cache = None
+    os.makedirs(args.output, exist_ok=True)
+
+    summary = {
+        'command': args.command,
+        'argv': sys.argv[1:] if argv is None else list(argv),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'inputs': expand_inputs(args.inputs),
+        'outputs': [], 'results': [], 'failures': [],
+    }
+    t0 = time.perf_counter()
+    args.run(args, summary)
+    summary['elapsed'] = time.perf_counter()-t0
+
+    text = json.dumps(json_safe(summary), ensure_ascii=False, indent=2, allow_nan=False)
+    if args.summary == '-':
+        print(text)
+    else:
+        path = args.summary or os.path.join(args.output, 'summary.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    for failure in summary['failures']:
+        print('%s | %s'%(failure['path'], failure['error']), file=sys.stderr)
+    return 1 if summary['failures'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
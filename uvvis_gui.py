@@ -1,14 +1,33 @@
 '''
 以uvvis为核心的一个简单的GUI界面程序
 '''
-from os import startfile
+import os, sys, queue, threading, subprocess
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from re import split
 import tkinter as tk
 import tkinter.messagebox
-from tkinter.filedialog import askdirectory, askopenfilenames
+from tkinter import ttk
+from tkinter.filedialog import askdirectory, askopenfilenames, asksaveasfilename
 import matplotlib.pyplot as plt
-import uvvis
+import uvvis, instrument
+from datacache import SpectrumCache
+
+POLL_MS = 100 #主线程查看后台任务进度的间隔
+
+def open_path(path):
+    '''
+    用系统默认的程序打开文件或文件夹
+    '''
+    if sys.platform == 'win32':
+        os.startfile(path)
+    elif sys.platform == 'darwin':
+        subprocess.Popen(['open', path])
+    else:
+        subprocess.Popen(['xdg-open', path])
+
+class JobCancelled(Exception):
+    '后台任务被取消'
 
 class Application(tk.Frame):
     def __init__(self, master=None):
@@ -16,9 +35,22 @@ class Application(tk.Frame):
         master.title('Uvvis')
         master.geometry('480x480')
         self.pack()
+        self.cache = SpectrumCache()
+        # 读取和导出在后台线程中进行，进度通过队列交给主线程
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.progress_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.future = None
+        master.protocol('WM_DELETE_WINDOW', self.close)
         self.create_widgets()
         self.home_page()
 
+    def close(self):
+        # 关闭窗口时取消未完成的后台任务
+        self.cancel_event.set()
+        self.executor.shutdown(wait=False)
+        self.master.destroy()
+
     def create_widgets(self):
         self.up_frame = tk.Frame(self)
         self.up_frame.pack(side='top')
@@ -52,6 +84,20 @@ class Application(tk.Frame):
         self.delete_button.pack(side='left', padx=10)
         self.manual_button = tk.Button(self, text='使用手册', command=self.manual)
 
+        self.progress_frame = tk.Frame(self)
+        self.progress_frame.pack(side='top')
+        self.progressbar = ttk.Progressbar(self.progress_frame, length=300, mode='determinate')
+        self.progressbar.pack(side='left', padx=10)
+        self.cancel_button = tk.Button(self.progress_frame, text='取消', command=self.cancel_job, state='disabled')
+        self.cancel_button.pack(side='left', padx=10)
+        self.profile_var = tk.BooleanVar(value=False)
+        self.profile_check = tk.Checkbutton(
+            self.progress_frame, text='记录耗时', variable=self.profile_var, command=self.toggle_profile)
+        self.profile_check.pack(side='left')
+        self.profile_button = tk.Button(self.progress_frame, text='耗时报告', command=self.show_profile)
+        self.status_label = tk.Label(self, text='')
+        self.status_label.pack(side='top')
+
         self.y_scrollbar = tk.Scrollbar(self.dirlist_frame, orient='vertical')
         self.y_scrollbar.pack(side='right', fill='y')
         self.x_scrollbar = tk.Scrollbar(self.dirlist_frame, orient='horizontal')
@@ -105,10 +151,10 @@ class Application(tk.Frame):
         if not dirc:
             tk.messagebox.showerror(title='Error', message='请选择文件夹')
         else:
-            startfile(dirc)
+            open_path(dirc)
 
     def manual(self):
-        startfile('manual.docx')
+        open_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manual.docx'))
 
     def clean_page(self):
         self.dir_label.pack_forget()
@@ -169,16 +215,93 @@ class Application(tk.Frame):
         self.args_entry.pack(side='top')
         self.return_button.pack(side='left', padx=10)
 
-    def read_ascfiles(self):
-        ascfiles = [self.dir_listbox.get(i) for i in range(self.dir_listbox.size())]
-        if not ascfiles:
-            raise ValueError('请添加asc文件')
+    def run_job(self, job, on_done, status):
+        '''
+        在后台线程中执行job(progress)，完成后在主线程中调用on_done(job的返回值)
+        job用progress(已完成数, 总数)报告进度，点击取消后progress抛出JobCancelled
+        job中不能操作界面，界面只在主线程中更新
+        '''
+        if self.future is not None:
+            tk.messagebox.showerror(title='Error', message='请等待当前任务完成')
+            return
+        self.cancel_event.clear()
+        while not self.progress_queue.empty():
+            self.progress_queue.get_nowait()
+        self.set_busy(True, status)
+        self.future = self.executor.submit(job, self.report_progress)
+        self.after(POLL_MS, self.poll_job, on_done)
+
+    def report_progress(self, done, total):
+        # 在后台线程中调用
+        if self.cancel_event.is_set():
+            raise JobCancelled
+        self.progress_queue.put((done, total))
+
+    def poll_job(self, on_done):
+        while True:
+            try:
+                done, total = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.progressbar['maximum'] = total
+            self.progressbar['value'] = done
+        if not self.future.done():
+            self.after(POLL_MS, self.poll_job, on_done)
+            return
+
+        future, self.future = self.future, None
+        self.set_busy(False)
+        try:
+            on_done(future.result())
+        except JobCancelled:
+            self.status_label['text'] = '已取消'
+        except Exception as e:
+            self.status_label['text'] = ''
+            tk.messagebox.showerror(title='Error', message=str(e))
+
+    def cancel_job(self):
+        if self.future is not None:
+            self.cancel_event.set()
+            self.status_label['text'] = '正在取消...'
+
+    def toggle_profile(self):
+        if self.profile_var.get():
+            instrument.reset()
+            instrument.enable()
+            self.profile_button.pack(side='left', padx=10)
+        else:
+            instrument.disable()
+
+    def show_profile(self):
+        tk.messagebox.showinfo(title='耗时报告', message=instrument.format_summary())
+        path = asksaveasfilename(
+            title='保存Chrome trace文件', defaultextension='.json', filetypes=[('JSON', '*.json')])
+        if path:
+            instrument.write_trace(path)
+
+    def set_busy(self, busy, status=''):
+        state = 'disabled' if busy else 'normal'
+        self.first_button['state'] = state
+        self.second_button['state'] = state
+        self.return_button['state'] = state
+        self.cancel_button['state'] = 'normal' if busy else 'disabled'
+        self.progressbar['value'] = 0
+        self.status_label['text'] = status
+
+    def listbox_items(self):
+        return [self.dir_listbox.get(i) for i in range(self.dir_listbox.size())]
+
+    def read_ascfiles(self, ascfiles, progress):
+        '''
+        在后台线程中依次读取asc文件，并以不重复的最短路径命名
+        '''
         uvvis_datas, splitnames, lens = [], [], []
+        n = len(ascfiles)
         for f in ascfiles:
-            uvvis_datas.append(uvvis.read_asc(f))
+            uvvis_datas.append(uvvis.read_asc(f, cache=self.cache))
             splitnames.append(split(r'/|\\', f.replace('.asc', '')))
             lens.append(len(splitnames[-1]))
-        n = len(ascfiles)
+            progress(len(uvvis_datas), n)
         loop = max(lens)
         for i in range(-1,-loop-1,-1):
             names = ['-'.join(sn[i:]) for sn in splitnames]
@@ -190,68 +313,116 @@ class Application(tk.Frame):
                 break
         return uvvis_datas
 
+    def get_ascfiles(self):
+        ascfiles = self.listbox_items()
+        if not ascfiles:
+            raise ValueError('请添加asc文件')
+        return ascfiles
+
     def show_uvvis(self):
         try:
             kwargs = input_args(self.args_entry.get())
-            uvvis_datas = self.read_ascfiles()
-            uvvis.draw_uvvis(uvvis_datas, **kwargs)
-            plt.show()
+            ascfiles = self.get_ascfiles()
         except Exception as e:
             tk.messagebox.showerror(title='Error', message=str(e))
+            return
+
+        def done(uvvis_datas):
+            self.status_label['text'] = ''
+            uvvis.draw_uvvis(uvvis_datas, **kwargs)
+            plt.show()
+        self.run_job(lambda progress: self.read_ascfiles(ascfiles, progress), done, '正在读取asc文件...')
 
     def write_uvvis_datas(self):
         try:
             ascdir = self.dir_label['text']
             if not ascdir:
                 raise ValueError('请选择文件夹')
-            if ascdir[-1] not in ['\\', '/']:
-                ascdir += '/'
-            xlsx_path = ascdir + 'uvvis_datas.xlsx'
-            uvvis_datas = self.read_ascfiles()
-            uvvis.write_xlsx(xlsx_path, uvvis_datas)
-            tk.messagebox.showinfo(title='Sucess', message='数据已保存至:'+xlsx_path)
+            xlsx_path = os.path.join(ascdir, 'uvvis_datas.xlsx')
+            ascfiles = self.get_ascfiles()
         except Exception as e:
             tk.messagebox.showerror(title='Error', message=str(e))
+            return
 
-    def read_ccdatas(self):
-        cc_datas = []
-        items = [self.dir_listbox.get(i) for i in range(self.dir_listbox.size())]
-        if not items:
-            raise ValueError('请添加asc文件夹')
+        def job(progress):
+            uvvis_datas = self.read_ascfiles(ascfiles, progress)
+            progress(0, 1)
+            uvvis.write_xlsx(xlsx_path, uvvis_datas)
+            return xlsx_path
+        self.run_job(job, self.show_saved, '正在读取asc文件并导出...')
+
+    def show_saved(self, xlsx_path):
+        self.status_label['text'] = ''
+        tk.messagebox.showinfo(title='Sucess', message='数据已保存至:'+xlsx_path)
+
+    def read_ccdatas(self, items, progress):
+        '''
+        在后台线程中读取各文件夹的asc文件并计算浓度变化
+        '''
+        series = []
         for i in items:
             wave, file_dir = i.split(' | ')
-            cc_datas.append(uvvis.get_concentration_change(
-                uvvis.read_ascdir(file_dir), float(wave), split(r'/|\\', file_dir)[-1]))
+            ascfiles = uvvis.list_ascfiles(file_dir)
+            if not ascfiles:
+                raise TypeError('%s文件夹内无asc文件！'%file_dir)
+            series.append((float(wave), file_dir, ascfiles))
+
+        total = sum(len(files) for wave, file_dir, files in series)
+        done = 0
+        cc_datas = []
+        for wave, file_dir, files in series:
+            uvvis_datas = []
+            for f in files:
+                uvvis_datas.append(uvvis.read_asc(f, cache=self.cache))
+                done += 1
+                progress(done, total)
+            cc_datas.append(uvvis.get_concentration_change(uvvis_datas, wave, split(r'/|\\', file_dir)[-1]))
         return cc_datas
 
+    def get_cc_items(self):
+        items = self.listbox_items()
+        if not items:
+            raise ValueError('请添加asc文件夹')
+        return items
+
     def show_cc_figure(self):
         try:
             kwargs = input_args(self.args_entry.get())
-            cc_datas = self.read_ccdatas()
-            uvvis.draw_concentration_change(cc_datas, **kwargs)
-            plt.show()
+            items = self.get_cc_items()
         except Exception as e:
             tk.messagebox.showerror(title='Error', message=str(e))
+            return
+
+        def done(cc_datas):
+            self.status_label['text'] = ''
+            uvvis.draw_concentration_change(cc_datas, **kwargs)
+            plt.show()
+        self.run_job(lambda progress: self.read_ccdatas(items, progress), done, '正在计算浓度变化...')
 
     def write_cc_datas(self):
         try:
             cc_filedir = self.dir_label['text']
             if not cc_filedir:
                 raise ValueError('请选择文件夹')
-            if cc_filedir[-1] not in ['\\', '/']:
-                cc_filedir += '/'
-            xlsx_path = cc_filedir + 'cc_datas.xlsx'
-            cc_datas = self.read_ccdatas()
-            uvvis.write_xlsx(xlsx_path, cc_datas)
-            tk.messagebox.showinfo(title='Sucess', message='数据已保存至:'+xlsx_path)
+            xlsx_path = os.path.join(cc_filedir, 'cc_datas.xlsx')
+            items = self.get_cc_items()
         except Exception as e:
             tk.messagebox.showerror(title='Error', message=str(e))
+            return
+
+        def job(progress):
+            cc_datas = self.read_ccdatas(items, progress)
+            progress(0, 1)
+            uvvis.write_xlsx(xlsx_path, cc_datas)
+            return xlsx_path
+        self.run_job(job, self.show_saved, '正在计算浓度变化并导出...')
 
 def input_args(s=''):
     l = {}
     exec('kwargs=dict(%s)' % s, globals(), l)
     return l['kwargs']
 
-root = tk.Tk()
-app = Application(master=root)
-app.mainloop()
+if __name__ == '__main__':
+    root = tk.Tk()
+    app = Application(master=root)
+    app.mainloop()
@@ -1,30 +1,138 @@
 '''
 处理紫外可见漫反射光谱的实验数据
 '''
-import os
+import os, re, glob
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import linregress
-from openpyxl import Workbook
 
-import calculation
+import calculation, mmapread
+
+# 数据段前的表头行"波长(nm)","T%"，只匹配不受编码影响的部分
+RAW_SENTINEL = re.compile(rb'^[^\r\n]*,"T%"\r?\n', re.M)
+# write_txt数据段的一行
+TXT_ROW = '\t'.join(['%r']*6)+'\n'
+
+# 批量拟合结果表的一行：样品名、直接/间接带隙(eV)及各自线性拟合的斜率、截距和相关系数
+BandGapResult = namedtuple('BandGapResult', ['name', 'egd', 'egi', 'kd', 'bd', 'rd', 'ki', 'bi', 'ri'])
 
 class UvvisDrsData:
     '''
     紫外可见漫反射光谱数据，一份数据包含了波长数组、反射率数组和数据名
+    logistic拟合和带隙等结果在第一次用到时才计算，之后直接使用计算结果
+    hv、F(R)、(hvF(R))^n计算很快，每次用到时重新计算，不占用内存
+    更换波长或反射率数组时，已计算的结果全部作废
+    dtype不为None时反射率数组以该类型存储（如np.float32），计算仍按float64进行
     '''
-    def __init__(self, wavelength_array, reflectance_array, name):
-        self.wavelength_array = wavelength_array
-        self.reflectance_array = reflectance_array
+    __slots__ = ('name', 'fit_method', 'p0', '_wavelength_array', '_reflectance_array',
+                 '_hvfr2_logi_fit', '_hvfr12_logi_fit', '_hvfr2_logi_params', '_hvfr12_logi_params',
+                 '_direct', '_indirect')
+
+    def __init__(self, wavelength_array, reflectance_array, name, fit_method='curve_fit', p0=None, dtype=None):
         self.name = name    #保存文件的绝对路径或相对路径
-        self.hv = self.calculate_hv(wavelength_array)
-        self.fr = self.calculate_fr()
-        self.hvfr2 = self.calculate_hvfr2()
-        self.hvfr12 = self.calculate_hvfr12()
-        self.hvfr2_logi_fit = calculation.logistic_fit(self.hv, self.hvfr2)
-        self.hvfr12_logi_fit = calculation.logistic_fit(self.hv, self.hvfr12)
-        self.egd, self.kd, self.bd, self.rd = self.calculate_eg(self.hvfr2, self.hvfr2_logi_fit)
-        self.egi, self.ki, self.bi, self.ri = self.calculate_eg(self.hvfr12, self.hvfr12_logi_fit)
+        self.fit_method = fit_method    #logistic拟合的方法，见calculation.logistic_fit
+        self.p0 = p0    #(hvfr2, hvfr12)两次logistic拟合的初始参数，可取上一个样品的logi_params
+        self._wavelength_array = wavelength_array
+        self._reflectance_array = reflectance_array if dtype is None else np.asarray(reflectance_array, dtype)
+        self._clear()
+
+    @classmethod
+    def from_results(cls, wavelength_array, reflectance_array, name,
+                     hvfr2_logi_fit, hvfr12_logi_fit, egd, kd, bd, rd, egi, ki, bi, ri):
+        '''
+        由已保存的拟合结果创建实例，不重新拟合
+        '''
+        drs = cls(wavelength_array, reflectance_array, name)
+        drs._hvfr2_logi_fit = hvfr2_logi_fit
+        drs._hvfr12_logi_fit = hvfr12_logi_fit
+        drs._direct = [egd, kd, bd, rd]
+        drs._indirect = [egi, ki, bi, ri]
+        return drs
+
+    def _clear(self):
+        '''
+        作废所有已计算的结果
+        '''
+        self._hvfr2_logi_fit = self._hvfr12_logi_fit = None
+        self._hvfr2_logi_params = self._hvfr12_logi_params = None
+        self._direct = self._indirect = None
+
+    @property
+    def wavelength_array(self):
+        return self._wavelength_array
+
+    @wavelength_array.setter
+    def wavelength_array(self, value):
+        self._wavelength_array = value
+        self._clear()
+
+    @property
+    def reflectance_array(self):
+        return self._reflectance_array
+
+    @reflectance_array.setter
+    def reflectance_array(self, value):
+        self._reflectance_array = value
+        self._clear()
+
+    hv = property(lambda self: self.calculate_hv(self.wavelength_array))
+    fr = property(lambda self: self.calculate_fr())
+    hvfr2 = property(lambda self: self.calculate_hvfr2())
+    hvfr12 = property(lambda self: self.calculate_hvfr12())
+
+    def _logistic_fit(self, y, n):
+        p0 = self.p0[n] if self.p0 else None
+        return calculation.logistic_fit(self.hv, y, self.fit_method, p0, return_params=True)
+
+    @property
+    def hvfr2_logi_fit(self):
+        if self._hvfr2_logi_fit is None:
+            self._hvfr2_logi_fit, self._hvfr2_logi_params = self._logistic_fit(self.hvfr2, 0)
+        return self._hvfr2_logi_fit
+
+    @property
+    def hvfr12_logi_fit(self):
+        if self._hvfr12_logi_fit is None:
+            self._hvfr12_logi_fit, self._hvfr12_logi_params = self._logistic_fit(self.hvfr12, 1)
+        return self._hvfr12_logi_fit
+
+    @property
+    def logi_params(self):
+        '''
+        两次logistic拟合的参数((t, r), (t, r))，可作为下一个样品的p0
+        由保存的结果创建的实例没有该参数，返回None
+        '''
+        self.hvfr2_logi_fit, self.hvfr12_logi_fit
+        if self._hvfr2_logi_params is None:
+            return None
+        return (self._hvfr2_logi_params, self._hvfr12_logi_params)
+
+    @property
+    def direct(self):
+        '''
+        直接带隙的拟合结果[eg, k, b, r]
+        '''
+        if self._direct is None:
+            self._direct = self.calculate_eg(self.hvfr2, self.hvfr2_logi_fit)
+        return self._direct
+
+    @property
+    def indirect(self):
+        '''
+        间接带隙的拟合结果[eg, k, b, r]
+        '''
+        if self._indirect is None:
+            self._indirect = self.calculate_eg(self.hvfr12, self.hvfr12_logi_fit)
+        return self._indirect
+
+    egd = property(lambda self: self.direct[0])
+    kd = property(lambda self: self.direct[1])
+    bd = property(lambda self: self.direct[2])
+    rd = property(lambda self: self.direct[3])
+    egi = property(lambda self: self.indirect[0])
+    ki = property(lambda self: self.indirect[1])
+    bi = property(lambda self: self.indirect[2])
+    ri = property(lambda self: self.indirect[3])
 
     def calculate_hv(self, wavelength_array):
         '''
@@ -38,7 +146,8 @@ class UvvisDrsData:
         Kubelka–Munk absorption function: F(R) = (1-R)^2/(2R)
         用上式计算出F(R)的值，其中R为reflectance
         '''
-        return ((1-self.reflectance_array)**2)/(2*self.reflectance_array)
+        r = np.asarray(self.reflectance_array, dtype=float)
+        return ((1-r)**2)/(2*r)
 
     def calculate_hvfr2(self):
         '''
@@ -52,90 +161,114 @@ class UvvisDrsData:
         '''
         return (self.hv*self.fr)**0.5
 
-    def calculate_eg(self, y, y_fit=0, fp=0, a=25):
+    def calculate_eg(self, y, y_fit=0, fp=0, a=25, scan=False):
         '''
         y_fit经过logistic拟合的y，对y_fit数值微分，求得微分最大值，取得该点的引索imdy
-        分别取该点周围n个(5<=n<=50)元素进行线性拟合，返回斜率k，截距b,相关系数r和imdy
+        分别取该点周围n个(5<=n<=50)元素进行线性拟合，从最大的窗口开始，取第一个r>0.99的窗口，
+        都不满足时取最小的窗口，返回带隙eg，斜率k，截距b和相关系数r
+        scan为True时在整条曲线上搜索线性段，见_scan_eg
+        各窗口的拟合结果由calculation.window_linregress一次算出
         '''
+        hv = self.hv
+        if scan:
+            return self._scan_eg(hv, y, a)
         if not fp:
-            dy=calculation.num_differ(self.hv, y_fit)
-            imdy=np.where(dy==max(dy))[0][0]
+            dy=calculation.num_differ(hv, y_fit)
+            centers=np.where(dy==max(dy))[0][:1]
         else:
-            absdif = np.fabs(self.hv-fp)
-            imdy=np.where(absdif==min(absdif))[0][0]
-        for i in range(a,1,-1):
-            if (imdy-i)>=0 and (imdy+i)<len(self.hv):
-                k, b, r, p, s = linregress(self.hv[(imdy-i):(imdy+i)], y[(imdy-i):(imdy+i)])
-                if r>0.99:
-                    break
+            absdif = np.fabs(hv-fp)
+            centers=np.where(absdif==min(absdif))[0][:1]
+        widths = np.arange(a, 1, -1)
+        k, b, r = calculation.window_linregress(hv, y, centers[:, None], widths[None, :])
+
+        valid = ~np.isnan(r)
+        good = valid & (r > 0.99)
+        # 每个中心点取第一个r>0.99的窗口，没有则取最后一个（最小的）有效窗口
+        last_valid = valid.shape[1]-1-np.argmax(valid[:, ::-1], axis=1)
+        chosen = np.where(good.any(axis=1), np.argmax(good, axis=1), last_valid)
+        if not valid.any():
+            raise ValueError('数据点不足，无法进行线性拟合')
+        # 前缀和只用于挑选窗口，最终结果在选中的窗口上直接计算，避免舍入误差
+        start, end = centers[0]-widths[chosen[0]], centers[0]+widths[chosen[0]]
+        k, b, r = calculation.linear_fit(hv[start:end], y[start:end])
         eg = -b/k
         return [eg, k, b, r]
 
-    def refit(self, n, fp=0, a=25):
+    def _scan_eg(self, hv, y, a):
+        '''
+        以曲线上每一点为中心取半宽2~a的窗口，在r>0.99且斜率为正的窗口中先取最宽的，同样宽时取最陡的（吸收边），
+        没有较宽的线性段时（如吸收边很窄）依次退回到较小的窗口，最小与默认规则相同，为左右各2个数据点
+        前缀和在曲线平坦处舍入误差较大，候选窗口按上述顺序直接拟合复核，返回第一个r>0.99的[eg, k, b, r]
+        '''
+        widths = np.arange(a, 1, -1)
+        centers = np.arange(len(hv))
+        k, b, r = calculation.window_linregress(hv, y, centers[:, None], widths[None, :])
+        rows, cols = np.nonzero((r > 0.99) & (k > 0))
+        order = np.lexsort((-k[rows, cols], -widths[cols]))
+        for i in order:
+            center, width = rows[i], widths[cols[i]]
+            k_, b_, r_ = calculation.linear_fit(hv[center-width:center+width], y[center-width:center+width])
+            if r_ > 0.99 and k_ > 0:
+                return [-b_/k_, k_, b_, r_]
+        raise ValueError('曲线上没有r>0.99的线性段')
+
+    def refit(self, n, fp=0, a=25, scan=False):
         '''
         根据输入的点x0和左右元素范围a重新拟合曲线，n为（hvfr）^n中的的指数n
+        scan为True时在整条曲线上搜索线性最好的一段，见calculate_eg
         '''
         if n == 2:
-            self.egd, self.kd, self.bd, self.rd = self.calculate_eg(self.hvfr2, fp=fp, a=a)
+            y_fit = 0 if fp or scan else self.hvfr2_logi_fit
+            self._direct = self.calculate_eg(self.hvfr2, y_fit, fp=fp, a=a, scan=scan)
             print('done')
         elif n == 0.5:
-            self.egi, self.ki, self.bi, self.ri = self.calculate_eg(self.hvfr12, fp=fp, a=a)
+            y_fit = 0 if fp or scan else self.hvfr12_logi_fit
+            self._indirect = self.calculate_eg(self.hvfr12, y_fit, fp=fp, a=a, scan=scan)
             print('done')
         else:
             print('please enter n=2 or n = 0.5')
     
+    def data_block(self):
+        '''
+        返回六列数据组成的二维数组：wavelength, R, hv, F(R), (hvF(R))^2, (hvF(R))^1/2
+        '''
+        return np.column_stack([
+            self.wavelength_array, self.reflectance_array, self.hv, self.fr, self.hvfr2, self.hvfr12])
+
+    def summary_lines(self):
+        '''
+        结果文件开头的样品名、带隙和线性拟合系数
+        '''
+        return [
+            'samlpe:  '+self.name,
+            'direct band gap: wevelength='+str(1240/self.egd)+'nm energy='+str(self.egd)+'eV',
+            'linear fit coefficient: slope='+str(self.kd)+' intercept='+str(self.bd)+' r='+str(self.rd),
+            'indirect band gap: wevelength='+str(1240/self.egi)+'nm energy='+str(self.egi)+'eV',
+            'linear fit coefficient: slope='+str(self.ki)+' intercept='+str(self.bi)+' r='+str(self.ri),
+        ]
+
     def write_txt(self):
         '''
         将数据写入至txt文件,保存路径为self.name+'_result.txt'
         '''
+        lines = self.summary_lines()
+        rows = self.data_block()
         with open(self.name.split('.')[0]+'_result.txt', 'w') as txt:
-            txt.write('samlpe:  '+self.name+'\n')
-            txt.write('direct band gap: wevelength='+str(1240/self.egd)+'nm energy='+str(self.egd)+'eV\n')
-            txt.write('\tlinear fit coefficient: slope='+str(self.kd)+' intercept='+str(self.bd)+' r='+str(self.rd))
-            txt.write('\nindirect band gap: wevelength='+str(1240/self.egi)+'nm energy='+str(self.egi)+'eV\n')
-            txt.write('\tlinear fit coefficient: slope='+str(self.ki)+' intercept='+str(self.bi)+' r='+str(self.ri))
+            txt.write(lines[0]+'\n'+lines[1]+'\n\t'+lines[2]+'\n'+lines[3]+'\n\t'+lines[4])
             txt.write('\ndatas:\n')
             txt.write('wavelength\tR\thv\tF(R)\t(hvF(R))^2\t(hvF(R))^1/2\n')
-            for data in zip(self.wavelength_array, self.reflectance_array, self.hv, self.fr, self.hvfr2, self.hvfr12):
-                line = ''
-                for each in data:
-                    line = line + str(each) + '\t'
-                txt.write(line[:-1] + '\n')
+            # 整个数据段一次格式化，float的repr与numpy float64的str一致
+            txt.write((TXT_ROW*len(rows)) % tuple(rows.ravel().tolist()))
 
         print('已保存至  ', self.name.split('.')[0]+'_result.txt')
 
     def write_xlsx(self):
-        wb = Workbook()
-        ws = wb.active
-        ws.merge_cells('A1:F1')
-        ws['A1'] = 'samlpe:  '+self.name
-        ws.merge_cells('A2:F2')
-        ws['A2'] = 'direct band gap: wevelength='+str(1240/self.egd)+'nm energy='+str(self.egd)+'eV'
-        ws.merge_cells('A3:F3')
-        ws['A3'] = 'linear fit coefficient: slope='+str(self.kd)+' intercept='+str(self.bd)+' r='+str(self.rd)
-        ws.merge_cells('A4:F4')
-        ws['A4'] = 'indirect band gap: wevelength='+str(1240/self.egi)+'nm energy='+str(self.egi)+'eV'
-        ws.merge_cells('A5:F5')
-        ws['A5'] = 'linear fit coefficient: slope='+str(self.ki)+' intercept='+str(self.bi)+' r='+str(self.ri)
-        ws['A'+str(6)] = 'datas:'
-        ws['A'+str(7)] = 'wavelength'
-        ws['B'+str(7)] = 'R'
-        ws['C'+str(7)] = 'hv'
-        ws['D'+str(7)] = 'F(R)'
-        ws['E'+str(7)] = '(hvF(R))^2'
-        ws['F'+str(7)] = '(hvF(R))^1/2'
-        i=7
-        for data in zip(self.wavelength_array, self.reflectance_array, self.hv, self.fr, self.hvfr2, self.hvfr12):
-            i+=1
-            ws['A'+str(i)] = data[0]
-            ws['B'+str(i)] = data[1]
-            ws['C'+str(i)] = data[2]
-            ws['D'+str(i)] = data[3]
-            ws['E'+str(i)] = data[4]
-            ws['F'+str(i)] = data[5]
+        '''
+        将数据写入至excel表格,保存路径为self.name+'_result.xlsx'
+        '''
         path = self.name.split('.')[0]+'_result.xlsx'
         try:
-            wb.save(path)
+            write_drs_xlsx(path, [self], sheet_names=['Sheet'])
             print('已保存至  ', path)
         except PermissionError as e:
             print(e, '\n无法保存文件，请确认该文件是否被其他程序打开')
@@ -146,49 +279,191 @@ class UvvisDrsData:
         传入UvvisDrsData实例
         绘制(hvF(R))^2-hv图和(hvF(R))^1/2-hv图
         '''
+        import matplotlib.pyplot as plt
+        hv, hvfr2, hvfr12 = self.hv, self.hvfr2, self.hvfr12
         fig = plt.figure()
         fig.set_size_inches(12,5.2)
         ax1 = fig.add_subplot(121)
         ax2 = fig.add_subplot(122)
-        ax1.plot(self.hv, self.hvfr2, label='direct')
-        ax1.plot([self.egd, (max(self.hvfr2)-self.bd)/self.kd], [0, max(self.hvfr2)])
+        ax1.plot(hv, hvfr2, label='direct')
+        ax1.plot([self.egd, (max(hvfr2)-self.bd)/self.kd], [0, max(hvfr2)])
         ax1.set_xlabel('hv (eV)')
         ax1.set_ylabel(r'$(hv F(R))^2$')
         handles, labels = ax1.get_legend_handles_labels()
         ax1.legend(handles, labels)
-        ax1.text(self.egd-0.25, max(self.hvfr2)/2,
+        ax1.text(self.egd-0.25, max(hvfr2)/2,
             (r'$\lambda$ = '+str(int(round(1240/self.egd)))+' nm\n'+r'$E_g$ = '+str(round(self.egd,2))+' eV'),
             horizontalalignment='right', verticalalignment='bottom')
 
-        ax2.plot(self.hv, self.hvfr12, label='indirect')
-        ax2.plot([self.egi, (max(self.hvfr12)-self.bi)/self.ki], [0, max(self.hvfr12)])
+        ax2.plot(hv, hvfr12, label='indirect')
+        ax2.plot([self.egi, (max(hvfr12)-self.bi)/self.ki], [0, max(hvfr12)])
         ax2.set_xlabel('hv (eV)')
         ax2.set_ylabel(r'$(hv F(R))^\frac{1}{2}$')
         handles, labels = ax2.get_legend_handles_labels()
         ax2.legend(handles, labels)
-        ax2.text(self.egi-0.25, max(self.hvfr12)/2,
+        ax2.text(self.egi-0.25, max(hvfr12)/2,
             (r'$\lambda$ = '+str(int(round(1240/self.egi)))+' nm\n'+r'$E_g$ = '+str(round(self.egi,2))+' eV'),
             horizontalalignment='right', verticalalignment='bottom')
         return fig
 
-def read_raw(file):
+def _sheet_name(name, used):
+    '''
+    由样品名生成不重复且符合excel要求的工作表名
+    '''
+    base = re.sub(r'[\[\]:*?/\\]', '_', os.path.splitext(os.path.basename(name))[0])[:31] or 'Sheet'
+    sheet, i = base, 1
+    while sheet.lower() in used:
+        i += 1
+        suffix = '_%d'%i
+        sheet = base[:31-len(suffix)]+suffix
+    used.add(sheet.lower())
+    return sheet
+
+def write_drs_xlsx(file_path, drs_datas, sheet_names=None):
+    '''
+    把多个UvvisDrsData写入同一个excel文件，每个样品一个工作表，表格格式与UvvisDrsData.write_xlsx相同
+    工作表默认以样品的文件名（不含扩展名）命名，逐行写出，内存占用不随样品数增长
+    '''
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(file_path, {'constant_memory': True, 'nan_inf_to_errors': True})
+    used = set()
+    for i, drs in enumerate(drs_datas):
+        ws = wb.add_worksheet(sheet_names[i] if sheet_names else _sheet_name(drs.name, used))
+        for row, line in enumerate(drs.summary_lines()):
+            ws.merge_range(row, 0, row, 5, line)
+        ws.write_row(5, 0, ['datas:'])
+        ws.write_row(6, 0, ['wavelength', 'R', 'hv', 'F(R)', '(hvF(R))^2', '(hvF(R))^1/2'])
+        for row, values in enumerate(drs.data_block().tolist()):
+            ws.write_row(row+7, 0, values)
+    wb.close()
+
+def read_raw(file, cache=None, **kwargs):
     '''
     读取存有DRS数据的txt文件
     支持读取以下型号的仪器产生的数据：
     UV-Visible diffuse reflectance spectroscopy UV-2550PC (Shimadzu Corporation, Japan)
+    cache为datacache.SpectrumCache实例时优先读取缓存
+    其他参数（fit_method、p0）传给UvvisDrsData
+    '''
+    if cache is None:
+        wavelength, reflectance = _parse_raw(file)
+    else:
+        wavelength, reflectance = cache.load(file, _parse_raw)
+    return UvvisDrsData(wavelength, reflectance, file, **kwargs)
+
+def _parse_raw(file):
+    '''
+    解析DRS数据文件，返回波长数组和反射率数组（已由T%换算为小数）
+    表头可以是GBK或UTF-8编码，数据段用内存映射分块解析
     '''
-    with open(file, 'r') as txt:
-        txtline = '1'
-        while txtline != '':
-            txtline = txt.readline()
-            if txtline == '"波长(nm)","T%"\n':
-                break
-        wavelength, reflectance_array = [], []
-        txtline = txt.readline()
-        while txtline != '':
-            txtline = txtline.strip('\n')
-            wavelength.append(float(txtline.split(',')[0]))
-            reflectance_array.append(float(txtline.split(',')[1]))
-            txtline = txt.readline()
-
-    return UvvisDrsData(np.array(wavelength), np.array(reflectance_array)/100, file)
+    wavelength, transmittance = mmapread.read_columns(file, RAW_SENTINEL, delimiter=b',')
+    transmittance /= 100
+    return wavelength, transmittance
+
+def find_raw_files(source):
+    '''
+    source为文件夹时返回其中的文件，为通配符时返回匹配的文件，为列表时返回列表中的文件
+    都只保留txt数据文件，略去write_txt输出的_result.txt和其他扩展名的文件
+    '''
+    if isinstance(source, (list, tuple)):
+        files = list(source)
+    elif os.path.isdir(source):
+        with os.scandir(source) as entries:
+            files = sorted(entry.path for entry in entries if entry.is_file())
+    else:
+        files = sorted(glob.glob(source))
+    return [f for f in files if f.endswith('.txt') and not f.endswith('_result.txt')]
+
+def _figure_name(file):
+    '由DRS文件路径得到图像名（文件名，不含扩展名）'
+    return os.path.splitext(os.path.basename(file))[0]
+
+def figure_paths(file, figure_dir, formats=('png',)):
+    'fit_batch为file保存的图像路径列表'
+    return [os.path.join(figure_dir, '%s.%s'%(_figure_name(file), fmt)) for fmt in formats]
+
+def _fit_file(file, cache=None, fit_method='curve_fit', p0=None, figures=None):
+    '''
+    读取并拟合一个文件，返回((BandGapResult, None), logistic拟合参数)
+    出错时返回((None, 异常), None)
+    figures为(文件夹, 格式, dpi)时用draw_hvfr绘图并以文件名（不含扩展名）保存，见report.save_figure
+    '''
+    try:
+        drs = read_raw(file, cache, fit_method=fit_method, p0=p0)
+        result = BandGapResult(drs.name, drs.egd, drs.egi, drs.kd, drs.bd, drs.rd, drs.ki, drs.bi, drs.ri)
+        if figures:
+            import report
+            out_dir, formats, dpi = figures
+            report.save_figure(drs.draw_hvfr(), out_dir, _figure_name(file), formats, dpi)
+        return (result, None), drs.logi_params
+    except Exception as e:
+        return (None, e), None
+
+def _fit_files(files, cache=None, fit_method='curve_fit', warm_start=False, figures=None):
+    '''
+    依次拟合多个文件，返回每个文件的(BandGapResult, None)，出错时为(None, 异常)
+    warm_start为True时以上一个成功拟合的样品的参数作为下一个样品logistic拟合的初始值
+    '''
+    results = []
+    p0 = None
+    for file in files:
+        result, params = _fit_file(file, cache, fit_method, p0, figures)
+        results.append(result)
+        if warm_start and params:
+            p0 = params
+    return results
+
+def fit_batch(source, workers=None, progress=None, cache=None, fit_method='curve_fit', warm_start=False,
+              figure_dir=None, formats=('png',), dpi=None):
+    '''
+    批量计算DRS样品的带隙，source的用法见find_raw_files
+    workers为并行拟合的进程数，为None或1时依次拟合
+    progress(已完成数, 总数, 文件路径)在文件完成后调用
+    fit_method为logistic拟合的方法，见calculation.logistic_fit
+    warm_start为True时每个进程以上一个样品的拟合参数作为下一个样品的初始值，文件分块交给各进程
+    figure_dir不为None时在拟合的进程中保存每个样品的(hvF(R))^n-hv图，路径见figure_paths，figure_dir不存在时自动创建，
+    绘图出错的文件计入出错列表；子进程使用Agg后端，依次拟合时沿用本进程的后端
+    单个文件出错不会中断其他文件
+    返回按文件顺序排列的BandGapResult列表，以及出错文件的(文件路径, 异常)列表
+    '''
+    files = find_raw_files(source)
+    figures = None if figure_dir is None else (figure_dir, formats, dpi)
+    if figure_dir is not None:
+        os.makedirs(figure_dir, exist_ok=True)
+    results = [None]*len(files)
+    if workers and workers > 1:
+        size = max(1, -(-len(files)//(workers*4))) if warm_start else 1
+        chunks = [range(i, min(i+size, len(files))) for i in range(0, len(files), size)]
+        done = 0
+        initializer = None
+        if figures:
+            # 只在子进程中选用Agg后端，不改变调用者的后端
+            import report
+            initializer = report.use_agg
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+            futures = {
+                executor.submit(_fit_files, [files[i] for i in chunk], cache, fit_method, warm_start, figures): chunk
+                for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                for i, result in zip(chunk, future.result()):
+                    results[i] = result
+                    done += 1
+                    if progress:
+                        progress(done, len(files), files[i])
+    else:
+        p0 = None
+        for i, f in enumerate(files):
+            results[i], params = _fit_file(f, cache, fit_method, p0, figures)
+            if warm_start and params:
+                p0 = params
+            if progress:
+                progress(i+1, len(files), f)
+
+    summary, failures = [], []
+    for f, (result, e) in zip(files, results):
+        if e is None:
+            summary.append(result)
+        else:
+            failures.append((f, e))
+    return summary, failures